@@ -1,34 +1,84 @@
 # agents/filter_tool.py
 
-from typing import List, Dict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from utils.input_parser import parse_tool_input
+from utils.product_table import ProductTable, matches
+from utils.result_store import put_results, resolve_products
 import json
 from langchain.tools import Tool
 
-def apply_filters(products: List[Dict], filters: Dict) -> List[Dict]:
-    print("filters---", filters)
-    print("product---", products)
-    def match(product):
-        if "max_price" in filters and product.get("price", 0) > filters["max_price"]:
-            return False
-        if "min_price" in filters and product.get("price", 0) < filters["min_price"]:
-            return False
-        if "min_rating" in filters and filters.get("min_rating") is not None and product.get("rating", 0) < filters["min_rating"]:
-            return False
-        if "brand" in filters:
-            for brand in filters["brand"]:
-                if brand.lower() not in product.get("brand", "").lower():
-                    return False
-        if "features" in filters:
-            product_features = product.get("features", [])
-            if not isinstance(product_features, list):
-                product_features = [f.strip() for f in product_features.split(",")]  # safe fallback
-            product_features_lower = [pf.lower() for pf in product_features]
-            if not all(f.lower() in product_features_lower for f in filters["features"]):
-                return False
-    return True
-
-    return [p for p in products if match(p)]
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+def _as_number(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(str(value).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+def normalize_filters(filters: Dict) -> Dict[str, Any]:
+    # LLM output is loose: brand may be a string or list, prices may be "$2,000" or null
+    normalized = {}
+    for key in ("min_price", "max_price", "min_rating"):
+        number = _as_number(filters.get(key))
+        if number is not None:
+            normalized[key] = number
+    for key in ("brand", "features"):
+        values = _as_list(filters.get(key))
+        if values:
+            normalized[key] = values
+    return normalized
+
+def match_brands(requested: Iterable[str], vocabulary: Iterable[str]) -> List[str]:
+    # Same rule as apply_filters: the requested brand is a case-insensitive substring
+    requested_lower = [b.lower() for b in requested]
+    return sorted({b for b in vocabulary if any(r in b.lower() for r in requested_lower)})
+
+def compile_where(filters: Dict, brand_vocabulary: Iterable[str]) -> Tuple[Optional[Dict], bool]:
+    """Compile intent filters into a Chroma `where` clause.
+
+    Returns (where, satisfiable). `where` is None when nothing can be pushed down;
+    `satisfiable` is False when no catalog product can possibly match.
+    Features stay a post-filter because Chroma string matching is case-sensitive.
+    """
+    filters = normalize_filters(filters)
+    clauses = []
+    if "min_price" in filters:
+        clauses.append({"price": {"$gte": filters["min_price"]}})
+    if "max_price" in filters:
+        clauses.append({"price": {"$lte": filters["max_price"]}})
+    if "min_rating" in filters:
+        clauses.append({"rating": {"$gte": filters["min_rating"]}})
+    if "brand" in filters:
+        brands = match_brands(filters["brand"], brand_vocabulary)
+        if not brands:
+            return None, False
+        clauses.append({"brand": {"$in": brands}})
+
+    if not clauses:
+        return None, True
+    if len(clauses) == 1:
+        return clauses[0], True
+    return {"$and": clauses}, True
+
+def apply_filters(products: List[Dict], filters: Dict, table: Optional[ProductTable] = None) -> List[Dict]:
+    """Keep the products matching `filters`.
+
+    With the catalog's ProductTable the filters compile to a cached whole-catalog
+    mask and candidates are looked up by id; without it each product is checked directly.
+    """
+    filters = normalize_filters(filters)
+    if not filters or not products:
+        return list(products)
+    if table is not None:
+        return table.filter_candidates(products, filters)
+    return [p for p in products if matches(p, filters)]
 
 
 def filtering_tool(input_data) -> str:
@@ -36,22 +86,27 @@ def filtering_tool(input_data) -> str:
     if isinstance(data, str):  # error case
         return data
 
-    products = data.get("products", [])
+    products = resolve_products(data)
     filters = data.get("filters", {})
 
-    if not isinstance(products, list) or not isinstance(filters, dict):
-        return "Invalid input: 'products' must be a list and 'filters' must be a dictionary."
+    if products is None:
+        return "Invalid input: 'result_id' is unknown or expired. Run ProductSearchTool again."
+    if not isinstance(filters, dict):
+        return "Invalid input: 'filters' must be a dictionary."
 
     print(f"Applying filters: {json.dumps(filters, indent=2)}")
     print(f"Number of products received: {len(products)}")
 
     filtered = apply_filters(products, filters)
-    #return json.dumps(filtered)
-    return json.dumps({"products": filtered}) 
+    # Hand back a new handle rather than the products themselves
+    return json.dumps(put_results(filtered))
 
 
 filter_tool = Tool(
     name="FilterTool",
     func=filtering_tool,
-    description="Filters products based on extracted filters. Input must include 'products' and 'filters'."
+    description=(
+        "Filters products based on extracted filters. Input must include 'result_id' (from ProductSearchTool) "
+        "and 'filters'. Returns a new 'result_id' and 'count'."
+    )
 )
@@ -4,9 +4,15 @@ from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_community.llms import Ollama
 from langchain.tools import Tool
-from typing import Dict
+from typing import Dict, Optional
 import json
 import re
+import threading
+import time
+from utils.query_parser import normalize_query, rule_based_intent, RULE_CONFIDENCE_THRESHOLD
+from utils.ttl_cache import TTLCache
+from agents.semantic_search_tool import catalog
+from utils.catalog import CatalogView
 
 # Load LLM
 llm = Ollama(model="mistral", temperature=0.0)
@@ -24,9 +30,61 @@ Respond with JSON only. Do not include any additional text or explanations.
 # Chain setup
 intent_chain = LLMChain(llm=llm, prompt=prompt)
 
+# Intent cache keyed on the normalized query; set INTENT_CACHE_PATH to keep it across restarts
+INTENT_CACHE_SIZE = 4096
+INTENT_CACHE_TTL = 24 * 3600
+INTENT_CACHE_PATH = None  # e.g. "intent_cache.sqlite3"
+intent_cache = TTLCache(maxsize=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL, persist_path=INTENT_CACHE_PATH)
+
+_stats_lock = threading.Lock()
+_stats = {"rule_parsed": 0, "llm_calls": 0, "llm_seconds": 0.0}
+
+def _record(key: str, value=1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+def intent_stats() -> Dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    cache_stats = intent_cache.stats()
+    avg_llm_seconds = stats["llm_seconds"] / stats["llm_calls"] if stats["llm_calls"] else 0.0
+    skipped = cache_stats["hits"] + stats["rule_parsed"]
+    requests = cache_stats["hits"] + cache_stats["misses"]
+    return {
+        "cache": cache_stats,
+        "rule_parsed": stats["rule_parsed"],
+        "llm_calls": stats["llm_calls"],
+        "avg_llm_seconds": avg_llm_seconds,
+        "llm_skip_rate": skipped / requests if requests else 0.0,
+        "saved_seconds_estimate": skipped * avg_llm_seconds,
+    }
+
 # Core function
-def extract_intent(query: str) -> str:
+def extract_intent(query: str, view: Optional[CatalogView] = None) -> str:
+    key = normalize_query(query)
+    cached = intent_cache.get(key)
+    if cached is not None:
+        print("\n🔍 Intent Extraction (cached):\n", cached)
+        return cached
+
+    # Simple queries (price ranges, ratings, catalog brands/features) never reach the LLM
+    view = view or catalog.view()
+    intent, confidence = rule_based_intent(query, view.brands, view.table.feature_index.keys())
+    if confidence >= RULE_CONFIDENCE_THRESHOLD:
+        _record("rule_parsed")
+        print("\n🔍 Intent Extraction (rules):\n", intent)
+        return json.dumps(intent)
+
+    result = _extract_intent_llm(query)
+    if "error" not in json.loads(result):
+        intent_cache.set(key, result)
+    return result
+
+def _extract_intent_llm(query: str) -> str:
+    started = time.perf_counter()
     response = intent_chain.run(query)
+    _record("llm_calls")
+    _record("llm_seconds", time.perf_counter() - started)
     print("\n🔍 Intent Extraction Output:\n", response)
     
     # Extract just the JSON if LLM added any fluff
@@ -1,21 +1,43 @@
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.docstore.document import Document
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import hashlib
 import json
+import multiprocessing
 import os
 import shutil
+import sys
+import time
+
+# Allow `python load_data_to_chroma.py` from this folder to import backend utils
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.catalog import CHROMA_DIR, bump_generation
+from utils.json_stream import iter_json_records
+from utils.lexical_index import BM25Index, index_path
 
-# === Step 1: Load dummy data ===
 # Get the path to the JSON file relative to this script
 current_dir = os.path.dirname(os.path.abspath(__file__))
-json_path = os.path.join(current_dir, "../../data/dummy_products.json")
+DEFAULT_FEED = os.path.join(current_dir, "../../data/dummy_products.json")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Page size when reading existing hashes back out of Chroma
+MANIFEST_PAGE_SIZE = 5000
+
+
+# === Step 1: Turn a feed record into a document ===
+def product_id(product: Dict) -> str:
+    # Stable across runs: prefer an explicit SKU, then the product URL
+    for key in ("id", "sku", "url"):
+        if product.get(key):
+            raw = f"{key}:{product[key]}"
+            break
+    else:
+        raw = f"title:{product.get('brand')}|{product.get('title')}|{product.get('source')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
-with open(json_path, "r") as f:
-    products = json.load(f)
 
-# === Step 2: Prepare documents for Chroma ===
-docs = []
-for product in products:
+def to_document(product: Dict) -> Tuple[str, Dict]:
     content = (
         f"{product['title']} by {product['brand']} with features "
         f"{', '.join(product['features'])}, priced at ${product['price']}, "
@@ -26,29 +48,144 @@ for product in products:
         "brand": product["brand"],
         "price": product["price"],
         "rating": product["rating"],
-        #"features": ", ".join(product["features"]),
-        "features": product["features"],  # Keep it as a list
+        # Chroma metadata values must be scalars; the filter tool splits this back up
+        "features": ", ".join(product["features"]),
         "url": product["url"],
         "source": product["source"]
     }
-    docs.append(Document(page_content=content, metadata=metadata))
-    print(type(metadata["features"]), metadata["features"])
+    digest = hashlib.sha256(json.dumps([content, metadata], sort_keys=True).encode("utf-8")).hexdigest()
+    metadata["content_hash"] = digest
+    return content, metadata
+
+
+def existing_hashes(vectorstore: Chroma) -> Dict[str, Optional[str]]:
+    hashes = {}
+    offset = 0
+    while True:
+        page = vectorstore.get(include=["metadatas"], limit=MANIFEST_PAGE_SIZE, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[doc_id] = (metadata or {}).get("content_hash")
+        if len(page["ids"]) < MANIFEST_PAGE_SIZE:
+            return hashes
+        offset += MANIFEST_PAGE_SIZE
+
+
+def changed_batches(records: Iterator[Dict], known: Dict[str, Optional[str]], seen: set,
+                    batch_size: int) -> Iterator[Tuple[List[str], List[str], List[Dict]]]:
+    ids, texts, metadatas = [], [], []
+    for product in records:
+        doc_id = product_id(product)
+        if doc_id in seen:
+            continue  # duplicate SKU in the feed, first one wins
+        seen.add(doc_id)
+        content, metadata = to_document(product)
+        if known.get(doc_id) == metadata["content_hash"]:
+            continue
+        ids.append(doc_id)
+        texts.append(content)
+        metadatas.append(metadata)
+        if len(ids) >= batch_size:
+            yield ids, texts, metadatas
+            ids, texts, metadatas = [], [], []
+    if ids:
+        yield ids, texts, metadatas
+
+
+# === Step 2: Embedding workers ===
+_worker_model = None
+
+
+def _init_worker(model_name: str) -> None:
+    global _worker_model
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
 
-# === Step 3: Initialize embedding model ===
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
-# === Step 4: Setup Chroma vector store ===
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_model.embed_documents(texts)
+
+
+# === Step 3: Incremental sync ===
+def sync_catalog(feed_path: str, chroma_dir: str = CHROMA_DIR, batch_size: int = 256,
+                 workers: int = 1, rebuild: bool = False) -> Dict:
+    started = time.perf_counter()
+    if rebuild and os.path.exists(chroma_dir):
+        shutil.rmtree(chroma_dir)
+
+    # With worker processes each one loads its own model; the parent only writes to Chroma
+    embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL) if workers <= 1 else None
+    vectorstore = Chroma(persist_directory=chroma_dir, embedding_function=embedding_model)
+    collection = vectorstore._collection
+
+    known = existing_hashes(vectorstore)
+    seen: set = set()
+    upserted = 0
+
+    # The BM25 sidecar is updated alongside Chroma; without one we rebuild it from the store
+    lexical_path = index_path(chroma_dir)
+    lexical = BM25Index() if rebuild else BM25Index.load(lexical_path)
+    rebuild_lexical = lexical is None
+    if rebuild_lexical:
+        lexical = BM25Index()
+
+    def write(ids, texts, metadatas, embeddings):
+        collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+        for doc_id, metadata in zip(ids, metadatas):
+            lexical.upsert(doc_id, metadata)
+        return len(ids)
+
+    batches = changed_batches(iter_json_records(feed_path), known, seen, batch_size)
+    if workers > 1:
+        # spawn, not fork: forking a process that has torch (or Chroma) threads running can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(EMBEDDING_MODEL,)) as executor:
+            # Keep a bounded number of batches in flight so memory stays flat on large feeds
+            pending = []
+            for ids, texts, metadatas in batches:
+                pending.append((ids, texts, metadatas, executor.submit(_embed_batch, texts)))
+                if len(pending) >= workers * 2:
+                    ids, texts, metadatas, future = pending.pop(0)
+                    upserted += write(ids, texts, metadatas, future.result())
+            for ids, texts, metadatas, future in pending:
+                upserted += write(ids, texts, metadatas, future.result())
+    else:
+        for ids, texts, metadatas in batches:
+            upserted += write(ids, texts, metadatas, embedding_model.embed_documents(texts))
+
+    removed = [doc_id for doc_id in known if doc_id not in seen]
+    for i in range(0, len(removed), batch_size):
+        collection.delete(ids=removed[i:i + batch_size])
+    for doc_id in removed:
+        lexical.remove(doc_id)
+
+    if rebuild_lexical:
+        store = vectorstore.get(include=["metadatas"])
+        lexical = BM25Index.from_products(store["ids"], store["metadatas"])
+    if upserted or removed or rebuild_lexical:
+        lexical.save(lexical_path)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "products_in_feed": len(seen),
+        "upserted": upserted,
+        "unchanged": len(seen) - upserted,
+        "deleted": len(removed),
+        "seconds": round(elapsed, 2),
+        "docs_per_second": round(upserted / elapsed, 1) if elapsed else 0.0,
+    }
+    if upserted or removed:
+        # Invalidate catalog snapshots held by running search/filter tools
+        report["generation"] = bump_generation(chroma_dir)
+    return report
 
-chroma_dir = "../../db/chroma_product_store"
-if os.path.exists(chroma_dir):
-    shutil.rmtree(chroma_dir)  # Optional: clears previous state
 
-vectorstore = Chroma.from_documents(
-    documents=docs,
-    embedding=embedding_model,
-    persist_directory=chroma_dir
-)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync a product feed (JSON array or JSONL) into Chroma.")
+    parser.add_argument("feed", nargs="?", default=DEFAULT_FEED)
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes (1 = in-process)")
+    parser.add_argument("--rebuild", action="store_true", help="drop the store and re-embed everything")
+    args = parser.parse_args()
 
-# Persist Chroma DB to disk
-vectorstore.persist()
-print(docs)
\ No newline at end of file
+    report = sync_catalog(args.feed, args.chroma_dir, args.batch_size, args.workers, args.rebuild)
+    print(json.dumps(report, indent=2))
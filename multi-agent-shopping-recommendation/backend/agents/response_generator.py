@@ -1,14 +1,49 @@
 # agents/response_generator.py
 
+import hashlib
 import json
-from typing import List, Dict, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Iterator, List, Optional, Union
 from utils.input_parser import parse_tool_input
+from utils.result_store import resolve_products
+from utils.ttl_cache import TTLCache
 from langchain.tools import Tool
 from langchain_community.llms import Ollama
 
 # Load Mistral via Ollama
 llm = Ollama(model="mistral", temperature=0.0)
 
+# Bump when build_prompt changes so old cached answers aren't reused
+PROMPT_VERSION = 1
+response_cache = TTLCache(maxsize=512, ttl=3600)
+
+# If Mistral hasn't answered within this budget, return the template response instead
+# (None waits indefinitely). The late answer still fills the cache when FILL_CACHE_LATE is set.
+RESPONSE_LATENCY_BUDGET_MS: Optional[int] = 15000
+FILL_CACHE_LATE = True
+# Calls running or queued on the executor; past this, answer with the template straight away
+# instead of queueing behind calls that would already blow the budget
+LLM_MAX_PENDING = 4
+_llm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="response-llm")
+_llm_slots = threading.BoundedSemaphore(LLM_MAX_PENDING)
+_stats_lock = threading.Lock()
+budget_fallbacks = 0
+backlog_fallbacks = 0
+
+def response_cache_key(products: List[Dict]) -> str:
+    # Everything the prompt depends on: template version plus the ordered top-5 products
+    identity = [
+        (p.get("id") or p.get("url") or p.get("title"), p.get("price"), p.get("rating"))
+        for p in products[:5]
+    ]
+    return hashlib.sha256(json.dumps([PROMPT_VERSION, identity], default=str).encode("utf-8")).hexdigest()
+
+def response_stats() -> Dict:
+    with _stats_lock:
+        return {"cache": response_cache.stats(), "budget_fallbacks": budget_fallbacks,
+                "backlog_fallbacks": backlog_fallbacks}
+
 # Fallback text formatter
 def generate_response(products: List[Dict]) -> str:
     if not products:
@@ -19,6 +54,51 @@ def generate_response(products: List[Dict]) -> str:
     print("response gneertaed by text not LLM")
     return "\n".join(lines)
 
+def build_prompt(products: List[Dict]) -> str:
+    # Format product info
+    product_context = "\n".join([
+        f"Product: {p['title']}, Price: ${p['price']}, Rating: {p['rating']}/5, URL: {p['url']}"
+        for p in products[:5]
+    ])
+
+    return f"""
+    Based on the following product information, create a helpful shopping recommendation:
+
+    {product_context}
+
+    Make the response user-friendly and engaging.
+    Include product URLs in the response if available.
+    """
+
+# Streaming variant: yields text chunks as Mistral generates them
+def stream_response(products: List[Dict]) -> Iterator[str]:
+    if not products:
+        yield "Sorry, I couldn't find any products matching your criteria. Please try adjusting your filters."
+        return
+
+    key = response_cache_key(products)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    try:
+        for chunk in llm.stream(build_prompt(products)):
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+    except Exception as e:
+        print(f"⚠️ LLM error: {e}")
+        # Text already sent can't be taken back; only fall back if nothing reached the client
+        if not chunks:
+            yield generate_response(products)
+        return
+    if "".join(chunks).strip():
+        response_cache.set(key, "".join(chunks))
+    elif not chunks:
+        yield generate_response(products)
+
 # Main response tool
 def response_tool_func(input_data: Union[str, List[Dict]]) -> str:
     # Parse input
@@ -30,42 +110,59 @@ def response_tool_func(input_data: Union[str, List[Dict]]) -> str:
         print("parsedInput-----", parsedInput)
         if isinstance(parsedInput, str):  # error string
             return parsedInput
-        products = parsedInput.get("products", [])
+        products = resolve_products(parsedInput)
+        if products is None:
+            return "Sorry, those search results have expired. Please search again."
         print("products in else block-----", products)
 
     # Validate
     if not isinstance(products, list) or not products:
         return "Sorry, I couldn't find any products matching your criteria. Please try adjusting your filters."
 
-    # Format product info
-    product_context = "\n".join([
-        f"Product: {p['title']}, Price: ${p['price']}, Rating: {p['rating']}/5, URL: {p['url']}"
-        for p in products[:5]
-    ])
-    
-    llm_prompt = f"""
-    Based on the following product information, create a helpful shopping recommendation:
-
-    {product_context}
+    key = response_cache_key(products)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
 
-    Make the response user-friendly and engaging.
-    Include product URLs in the response if available.
-    """
+    llm_prompt = build_prompt(products)
 
-    # Call LLM safely
+    # Call LLM safely, within the latency budget
+    global budget_fallbacks, backlog_fallbacks
+    if not _llm_slots.acquire(blocking=False):
+        with _stats_lock:
+            backlog_fallbacks += 1
+        print(f"⚠️ {LLM_MAX_PENDING} LLM calls already pending, using template response")
+        return generate_response(products)
+    future = _llm_executor.submit(llm.invoke, llm_prompt)
+    future.add_done_callback(lambda f: _llm_slots.release())
     try:
-        llm_response = llm.invoke(llm_prompt)
-        if not llm_response.strip():        
+        timeout = RESPONSE_LATENCY_BUDGET_MS / 1000 if RESPONSE_LATENCY_BUDGET_MS is not None else None
+        llm_response = future.result(timeout=timeout)
+        if not llm_response.strip():
             raise ValueError("Empty response")
+        response_cache.set(key, llm_response)
         return llm_response
+    except FutureTimeout:
+        with _stats_lock:
+            budget_fallbacks += 1
+        print(f"⚠️ LLM exceeded {RESPONSE_LATENCY_BUDGET_MS} ms, using template response")
+        # A call still queued is dropped; one already running can't be interrupted,
+        # so its answer at least fills the cache
+        if not future.cancel() and FILL_CACHE_LATE:
+            future.add_done_callback(lambda f: _cache_late_response(key, f))
+        return generate_response(products)
     except Exception as e:
         print(f"⚠️ LLM error: {e}")
         return generate_response(products)
 
+def _cache_late_response(key: str, future) -> None:
+    if not future.cancelled() and future.exception() is None and future.result().strip():
+        response_cache.set(key, future.result())
+
 # LangChain Tool wrapper
 response_tool = Tool(
     name="ResponseFormatter",
     func=response_tool_func,
-    description="Converts filtered product list (in JSON) into a user-friendly response.",
+    description="Converts a product result set into a user-friendly response. Input must include 'result_id'.",
     return_direct=True
 )
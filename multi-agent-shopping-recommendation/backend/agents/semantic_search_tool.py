@@ -1,24 +1,79 @@
 # agents/semantic_search_tool.py
 
-from typing import Union
+from typing import Dict, List, Optional, Union
 import json
 from langchain.tools import Tool
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from utils.input_parser import parse_tool_input
+from utils.catalog import CHROMA_DIR, CatalogSnapshot, CatalogView
+from utils.embedding_cache import CachedEmbeddings
+from utils.result_store import put_results
+from utils.lexical_index import reciprocal_rank_fusion
+from agents.filter_tool import apply_filters, compile_where
 
-# Load embedding model
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Load embedding model; query vectors are cached (set QUERY_EMBEDDING_CACHE_PATH to persist them)
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+QUERY_EMBEDDING_CACHE_PATH = None  # e.g. "query_embeddings.sqlite3"
+embedding_model = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    persist_path=QUERY_EMBEDDING_CACHE_PATH
+)
 
 # Load vector store
 vectorstore = Chroma(
-    persist_directory="../../db/chroma_product_store",
+    persist_directory=CHROMA_DIR,
     embedding_function=embedding_model
 )
 
+# Read-only product metadata, reloaded only when the indexer bumps the generation
+catalog = CatalogSnapshot(vectorstore, CHROMA_DIR)
+
 # Toggle this to False in prod
 DEBUG = True
 
+# Number of post-filter hits we aim for, and how far k may grow to find them
+DEFAULT_LIMIT = 10
+MAX_FETCH_K = 200
+
+def vector_search_ids(query_embedding: List[float], k: int, where: Optional[Dict]) -> List[str]:
+    result = vectorstore._collection.query(
+        query_embeddings=[query_embedding], n_results=k, where=where, include=["distances"]
+    )
+    return result["ids"][0]
+
+def filtered_search(query: str, filters: Dict, limit: int = DEFAULT_LIMIT,
+                    view: Optional[CatalogView] = None) -> List[Dict]:
+    # One catalog generation for the whole search, however many passes it takes
+    view = view or catalog.view()
+    where, satisfiable = compile_where(filters, view.brands)
+    if not satisfiable:
+        return []
+
+    # Embed once; each widening pass reuses the vector
+    query_embedding = embedding_model.embed_query(query)
+    # Exact spec tokens ("RTX 4060", "144Hz") come from BM25, meaning from the embedding.
+    # BM25 ranks don't depend on k, so score once at the widest k and slice per pass.
+    lexical_ranking = [doc_id for doc_id, _ in view.lexical.search(query, MAX_FETCH_K)]
+    fetch_k = limit
+    while True:
+        vector_ids = vector_search_ids(query_embedding, fetch_k, where)
+        lexical_ids = lexical_ranking[:fetch_k]
+        fused = reciprocal_rank_fusion(vector_ids, lexical_ids)
+        rows = ((doc_id, view.get(doc_id)) for doc_id in fused)
+        candidates = [dict(row, id=doc_id) for doc_id, row in rows if row is not None]
+        # Lexical hits haven't seen the where clause, and features are never pushed down
+        matches = apply_filters(candidates, filters, view.table)
+        exhausted = len(vector_ids) < fetch_k and len(lexical_ids) < fetch_k
+        if len(matches) >= limit or exhausted or fetch_k >= MAX_FETCH_K:
+            break
+        fetch_k = min(fetch_k * 2, MAX_FETCH_K)
+
+    if DEBUG:
+        print(f"where={where}, fetch_k={fetch_k}, vector={len(vector_ids)}, lexical={len(lexical_ids)}, hits={len(matches)}")
+    return matches[:limit]
+
 def semantic_search(query_input: str) -> str:
     if DEBUG:
         print("\n🔍 Semantic Search Tool Input:\n", query_input)
@@ -31,40 +86,44 @@ def semantic_search(query_input: str) -> str:
     if not query:
         return json.dumps({"error": "No query found in input."})
 
-    # Load store metadata once
-    store_data = vectorstore.get()
-    if(store_data is not None):
-        print("\n store_data in chroma db ---", store_data)
-
     if DEBUG:
-        print(f"Number of documents in vector store: {len(store_data['documents'])}")
-        print("\n🔍 Metadata of Documents in Vector Store:\n")
-        for metadata in store_data["metadatas"]:
-            print(metadata)
+        view = catalog.view()
+        print(f"Number of documents in vector store: {len(view)} (generation {view.generation})")
+
+    filters = data.get("filters") or {}
+    if not isinstance(filters, dict):
+        return json.dumps({"error": "'filters' must be a dictionary."})
+    try:
+        limit = int(data.get("limit", DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
 
     # Perform search
     print("query before semantic serach--", query)
-    results = vectorstore.similarity_search(query, k=10)
-    matches = [r.metadata for r in results]
-    
+    matches = filtered_search(query, filters, limit=max(limit, 1))
+
     if DEBUG:
-        print("\n🔍 Semantic Search results:\n", results)
         print("\n🔍 Semantic Search Tool Output:\n", matches)
 
-    #return json.dumps(matches)
-    return json.dumps({"products": matches}) 
+    # The products stay server-side; the agent only sees a small handle
+    return json.dumps(put_results(matches))
 
 # LangChain Tool wrapper
 search_tool = Tool(
     name="ProductSearchTool",
     func=semantic_search,
-    description="Searches for products semantically. Input should be a JSON with 'query'."
+    description=(
+        "Searches for products semantically. Input should be a JSON with 'query' and, optionally, "
+        "'filters' (brand, min_price, max_price, min_rating, features) from IntentExtractionTool. "
+        "Returns a 'result_id' handle and 'count'; products already satisfy the filters."
+    )
 )
 
 # Example usage for CLI
 if __name__ == "__main__":
     user_query = json.dumps({
-        "query": "Dell gaming laptop with RTX 4060 equivalent GPU and high refresh rate display"
+        "query": "Dell gaming laptop with RTX 4060 equivalent GPU and high refresh rate display",
+        "filters": {"brand": "Dell", "max_price": 2000}
     })
     print("\n🔗 Running semantic search...\n")
     result = semantic_search(user_query)
@@ -1,15 +1,91 @@
 # backend/api.py
 
-from fastapi import FastAPI, Request
+import json
+import logging
+import os
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from main_agent_executor import agent_executor
+from pipeline import PipelineError, run_pipeline, stream_pipeline
+from agents.intent_extraction_agent import intent_stats
+from agents.semantic_search_tool import embedding_model
+from agents.response_generator import response_stats
+from utils.query_parser import normalize_query
+from utils.request_pool import Overloaded, RequestPool
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Concurrent /recommend executions should match how many requests Ollama serves in parallel
+RECOMMEND_CONCURRENCY = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))
+RECOMMEND_QUEUE_DEPTH = 16
+pool = RequestPool(max_concurrency=RECOMMEND_CONCURRENCY, max_queue=RECOMMEND_QUEUE_DEPTH)
+
 class QueryInput(BaseModel):
     query: str
+    # "pipeline" runs the fixed tool DAG and falls back to the agent; "agent" forces the ReAct loop
+    mode: Literal["pipeline", "agent"] = "pipeline"
+
+def run_agent(query: str) -> str:
+    result = agent_executor.invoke({"input": query})
+    return result.get("output", "No response")
+
+def too_many_requests(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def recommend(query: str, mode: str) -> dict:
+    if mode == "pipeline":
+        try:
+            return {"response": await run_pipeline(query), "mode": "pipeline"}
+        except PipelineError as e:
+            logger.warning(f"Pipeline could not handle query, falling back to agent: {e}")
+    return {"response": await pool.run_blocking(run_agent, query), "mode": "agent"}
 
 @app.post("/recommend")
 async def recommend_products(input: QueryInput):
-    result = agent_executor.invoke({"input": input.query})
-    return {"response": result.get("output", "No response")}
+    # Identical in-flight queries share one execution
+    key = f"{input.mode}:{normalize_query(input.query)}"
+    try:
+        return await pool.run(key, lambda: recommend(input.query, input.mode))
+    except Overloaded as e:
+        raise too_many_requests(e)
+
+@app.post("/recommend/stream")
+async def recommend_products_stream(input: QueryInput):
+    if pool.is_full():
+        raise too_many_requests(Overloaded(pool.retry_after()))
+
+    # Newline-delimited JSON events: products, token*, done
+    async def events():
+        try:
+            slot = pool.slot()
+        except Overloaded as e:
+            yield json.dumps({"type": "error", "detail": str(e), "retry_after": e.retry_after}) + "\n"
+            return
+        async with slot:
+            mode = input.mode
+            if mode == "pipeline":
+                try:
+                    async for event in stream_pipeline(input.query):
+                        yield json.dumps(event) + "\n"
+                except PipelineError as e:
+                    logger.warning(f"Pipeline could not handle query, falling back to agent: {e}")
+                    mode = "agent"
+            if mode == "agent":
+                answer = await pool.run_blocking(run_agent, input.query)
+                yield json.dumps({"type": "token", "text": answer}) + "\n"
+            yield json.dumps({"type": "done", "mode": mode}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/stats")
+async def stats():
+    return {
+        "intent": intent_stats(),
+        "embeddings": embedding_model.stats(),
+        "response": response_stats(),
+        "pool": pool.stats(),
+    }
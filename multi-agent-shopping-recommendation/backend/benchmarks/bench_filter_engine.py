@@ -0,0 +1,97 @@
+# benchmarks/bench_filter_engine.py
+#
+# Compares the columnar ProductTable filter with the old per-dict match() loop.
+# Run from backend/:  python -m benchmarks.bench_filter_engine --rows 1000000
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from utils.product_table import ProductTable
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data/dummy_products.json")
+
+FILTERS = [
+    {"max_price": 2000.0, "brand": ["asus"]},
+    {"min_price": 800.0, "max_price": 1500.0, "min_rating": 4.3},
+    {"brand": ["lenovo", "dell"], "features": ["16gb ram", "rtx 4060"]},
+]
+
+
+def legacy_apply_filters(products: List[Dict], filters: Dict) -> List[Dict]:
+    # The previous implementation (with its early `return True` fixed)
+    def match(product):
+        if "max_price" in filters and product.get("price", 0) > filters["max_price"]:
+            return False
+        if "min_price" in filters and product.get("price", 0) < filters["min_price"]:
+            return False
+        if "min_rating" in filters and product.get("rating", 0) < filters["min_rating"]:
+            return False
+        if "brand" in filters:
+            if not any(b.lower() in product.get("brand", "").lower() for b in filters["brand"]):
+                return False
+        if "features" in filters:
+            product_features_lower = [pf.lower() for pf in product.get("features", [])]
+            if not all(f.lower() in product_features_lower for f in filters["features"]):
+                return False
+        return True
+
+    return [p for p in products if match(p)]
+
+
+def synthetic_catalog(rows: int, seed: int = 7) -> List[Dict]:
+    with open(DATA_PATH, "r") as f:
+        base = json.load(f)
+    rng = random.Random(seed)
+    extra_features = ["RTX 4050", "RTX 4060", "RTX 4070", "8GB RAM", "16GB RAM", "32GB RAM",
+                      "512GB SSD", "1TB SSD", "144Hz", "165Hz", "240Hz", "Backlit Keyboard"]
+    products = []
+    for i in range(rows):
+        p = dict(base[i % len(base)])
+        p["title"] = f"{p['title']} #{i}"
+        p["price"] = round(p["price"] * rng.uniform(0.6, 1.6), 2)
+        p["rating"] = round(min(5.0, max(1.0, p["rating"] + rng.uniform(-1, 0.5))), 1)
+        p["features"] = list(p["features"]) + rng.sample(extra_features, 2)
+        products.append(p)
+    return products
+
+
+def timed(fn, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    products = synthetic_catalog(args.rows)
+    build_s, table = timed(lambda: ProductTable(products), repeat=1)
+    print(f"rows={args.rows:,}  table build: {build_s * 1000:.0f} ms (once per catalog generation)")
+
+    for filters in FILTERS:
+        legacy_s, legacy = timed(lambda: legacy_apply_filters(products, filters))
+        table._mask_cache.clear()
+        cold_s, _ = timed(lambda: table.compile(filters), repeat=1)
+        warm_s, _ = timed(lambda: table.compile(filters))
+        select_s, selected = timed(lambda: table.select(filters))
+        assert len(selected) == len(legacy), (len(selected), len(legacy))
+        print(
+            f"{json.dumps(filters)}\n"
+            f"  hits={len(legacy):,}  legacy loop: {legacy_s * 1000:.1f} ms  "
+            f"mask: {cold_s * 1000:.2f} ms (cached {warm_s * 1000:.3f} ms)  "
+            f"mask+rows: {select_s * 1000:.1f} ms  speedup(mask): {legacy_s / cold_s:.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
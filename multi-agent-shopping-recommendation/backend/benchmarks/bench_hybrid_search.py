@@ -0,0 +1,88 @@
+# benchmarks/bench_hybrid_search.py
+#
+# Recall@k and latency of vector-only vs BM25 + vector (RRF) candidate generation
+# on a synthetic scale-up of data/dummy_products.json.
+# Run from backend/:  python -m benchmarks.bench_hybrid_search --rows 20000
+
+import argparse
+import random
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+import chromadb
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from benchmarks.bench_filter_engine import synthetic_catalog
+from utils.lexical_index import BM25Index, reciprocal_rank_fusion
+
+K_VALUES = (5, 10, 20)
+
+
+def build_queries(products: List[Dict], count: int, seed: int = 11) -> List[Tuple[str, Set[str]]]:
+    # Query two spec tokens; every product carrying both is relevant
+    rng = random.Random(seed)
+    by_pair: Dict[Tuple[str, str], Set[str]] = {}
+    for i, p in enumerate(products):
+        features = sorted(p["features"])
+        for a in range(len(features)):
+            for b in range(a + 1, len(features)):
+                by_pair.setdefault((features[a], features[b]), set()).add(str(i))
+    pairs = rng.sample(sorted(by_pair), min(count, len(by_pair)))
+    return [(f"laptop with {a} and {b}", by_pair[(a, b)]) for a, b in pairs]
+
+
+def recall(ranked: List[str], relevant: Set[str], k: int) -> float:
+    return len(set(ranked[:k]) & relevant) / min(k, len(relevant))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    products = synthetic_catalog(args.rows)
+    ids = [str(i) for i in range(len(products))]
+    texts = [f"{p['title']} by {p['brand']} with features {', '.join(p['features'])}, "
+             f"priced at ${p['price']}, rated {p['rating']} stars." for p in products]
+
+    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="bench_hybrid_"))
+    collection = client.create_collection("bench")
+    start = time.perf_counter()
+    for i in range(0, len(texts), 1000):
+        collection.add(ids=ids[i:i + 1000], documents=texts[i:i + 1000],
+                       embeddings=embeddings.embed_documents(texts[i:i + 1000]))
+    print(f"rows={len(products):,}  embedded in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    lexical = BM25Index.from_products(ids, products)
+    print(f"BM25 index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    queries = build_queries(products, args.queries)
+    for k in K_VALUES:
+        totals = {"vector": [0.0, 0.0], "hybrid": [0.0, 0.0]}
+        for query, relevant in queries:
+            query_embedding = embeddings.embed_query(query)
+
+            start = time.perf_counter()
+            vector_ids = collection.query(query_embeddings=[query_embedding], n_results=k, include=["distances"])["ids"][0]
+            totals["vector"][0] += time.perf_counter() - start
+            totals["vector"][1] += recall(vector_ids, relevant, k)
+
+            start = time.perf_counter()
+            vector_ids = collection.query(query_embeddings=[query_embedding], n_results=k, include=["distances"])["ids"][0]
+            lexical_ids = [doc_id for doc_id, _ in lexical.search(query, k)]
+            fused = reciprocal_rank_fusion(vector_ids, lexical_ids)
+            totals["hybrid"][0] += time.perf_counter() - start
+            totals["hybrid"][1] += recall(fused, relevant, k)
+
+        n = len(queries)
+        print(f"k={k:<3} " + "  ".join(
+            f"{name}: recall={r / n:.3f} latency={t / n * 1000:.1f}ms" for name, (t, r) in totals.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# backend/pipeline.py
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List
+from starlette.concurrency import iterate_in_threadpool
+
+from agents.intent_extraction_agent import extract_intent
+from agents.semantic_search_tool import catalog, filtered_search, DEFAULT_LIMIT
+from agents.filter_tool import apply_filters, normalize_filters
+from agents.response_generator import response_tool_func, stream_response
+
+# How many products we want to hand to the response step
+PIPELINE_LIMIT = 5
+
+
+class PipelineError(Exception):
+    """Raised when the fixed pipeline can't handle a query; callers fall back to the agent."""
+
+
+def parse_intent(intent_json: str) -> Dict:
+    try:
+        intent = json.loads(intent_json)
+    except (TypeError, json.JSONDecodeError):
+        raise PipelineError("Intent extraction returned invalid JSON")
+    if not isinstance(intent, dict) or "error" in intent:
+        raise PipelineError(f"Intent extraction failed: {intent}")
+    return intent
+
+
+async def find_products(query: str) -> List[Dict]:
+    # Every step of the request reads the same catalog generation
+    view = await asyncio.to_thread(catalog.view)
+    # Intent extraction (LLM) and the unfiltered vector search don't depend on each other
+    intent_task = asyncio.to_thread(extract_intent, query, view)
+    search_task = asyncio.to_thread(filtered_search, query, {}, DEFAULT_LIMIT, view)
+    intent_json, candidates = await asyncio.gather(intent_task, search_task)
+
+    filters = normalize_filters(parse_intent(intent_json))
+    if not filters:
+        return candidates[:PIPELINE_LIMIT]
+
+    products = apply_filters(candidates, filters, view.table)
+    if len(products) < PIPELINE_LIMIT:
+        # Not enough survivors among the unfiltered hits: search again with the filters pushed down
+        products = await asyncio.to_thread(filtered_search, query, filters, PIPELINE_LIMIT, view)
+    return products[:PIPELINE_LIMIT]
+
+
+async def run_pipeline(query: str) -> str:
+    """IntentExtraction -> ProductSearch -> Filter -> ResponseFormatter without the ReAct loop."""
+    products = await find_products(query)
+    return await asyncio.to_thread(response_tool_func, products)
+
+
+async def stream_pipeline(query: str) -> AsyncIterator[Dict]:
+    """Same DAG as run_pipeline, but yields the product list first and then response tokens."""
+    products = await find_products(query)
+    yield {"type": "products", "products": products}
+    # The Ollama stream is blocking; pull it from a worker thread
+    async for chunk in iterate_in_threadpool(stream_response(products)):
+        yield {"type": "token", "text": chunk}
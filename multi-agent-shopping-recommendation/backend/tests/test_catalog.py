@@ -0,0 +1,50 @@
+# tests/test_catalog.py
+
+from utils import catalog as catalog_module
+from utils.catalog import CatalogSnapshot, bump_generation
+
+
+class FakeStore:
+    def __init__(self):
+        self.version = 0
+        self.loads = 0
+
+    def get(self, include):
+        self.loads += 1
+        return {
+            "ids": ["p1", "p2"],
+            "metadatas": [{"title": f"Laptop v{self.version}", "brand": "Dell", "price": 999.0, "rating": 4.5,
+                           "features": "RTX 4060"},
+                          {"title": "Ultrabook", "brand": "HP", "price": 799.0, "rating": 4.0, "features": "16GB RAM"}],
+        }
+
+
+def test_view_reads_the_generation_once(tmp_path, monkeypatch):
+    catalog = CatalogSnapshot(FakeStore(), str(tmp_path / "store"))
+    reads = []
+    read_generation = catalog_module.read_generation
+    monkeypatch.setattr(catalog_module, "read_generation", lambda path: reads.append(path) or read_generation(path))
+
+    view = catalog.view()
+    for _ in range(50):
+        view.get("p1")
+        view.table
+        view.lexical
+    assert len(reads) == 1
+
+
+def test_view_stays_on_its_generation_across_a_reindex(tmp_path):
+    store = FakeStore()
+    catalog = CatalogSnapshot(store, str(tmp_path / "store"))
+    view = catalog.view()
+
+    store.version = 1
+    bump_generation(str(tmp_path / "store"))
+    fresh = catalog.view()
+
+    assert view.get("p1")["title"] == "Laptop v0"
+    assert fresh.get("p1")["title"] == "Laptop v1"
+    assert (view.generation, fresh.generation, store.loads) == (0, 1, 2)
+    # Derived structures follow the view they were asked through
+    assert view.table is not fresh.table
+    assert catalog.table is fresh.table
@@ -0,0 +1,45 @@
+# tests/test_product_table.py
+
+import threading
+
+from utils import product_table
+from utils.product_table import ProductTable
+
+
+def catalog(n=200):
+    return [{"title": f"Laptop {i}", "brand": ("Dell", "HP", "Lenovo")[i % 3], "price": float(i * 10),
+             "rating": 3 + (i % 3) * 0.5, "features": ["RTX 4060"] if i % 2 else ["16GB RAM"]} for i in range(n)]
+
+
+def test_compile_matches_the_row_filter():
+    products = catalog()
+    table = ProductTable(products, ids=[str(i) for i in range(len(products))])
+    filters = {"brand": ["dell"], "max_price": 1200, "features": ["rtx 4060"]}
+
+    expected = [p for p in products if product_table.matches(p, filters)]
+    assert table.select(filters) == expected
+    candidates = [dict(p, id=str(i)) for i, p in enumerate(products)][::-1]
+    assert [c["title"] for c in table.filter_candidates(candidates, filters)] == [p["title"] for p in expected[::-1]]
+
+
+def test_mask_cache_is_safe_across_threads(monkeypatch):
+    monkeypatch.setattr(product_table, "MASK_CACHE_SIZE", 4)
+    table = ProductTable(catalog())
+    filter_sets = [{"max_price": float(p)} for p in range(0, 2000, 50)]
+    errors = []
+
+    def hammer(offset):
+        try:
+            for i in range(300):
+                filters = filter_sets[(i * 7 + offset) % len(filter_sets)]
+                assert int(table.compile(filters).sum()) == int(filters["max_price"] // 10) + 1
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(table._mask_cache) <= 4
@@ -0,0 +1,79 @@
+# tests/test_request_pool.py
+
+import asyncio
+
+import pytest
+
+from utils.request_pool import Overloaded, RequestPool
+
+
+def test_cancelled_waiter_releases_its_place():
+    async def scenario():
+        pool = RequestPool(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with pool.slot():
+                await release.wait()
+
+        async def queued():
+            async with pool.slot():
+                pass
+
+        running = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(queued())
+        await asyncio.sleep(0)
+        assert pool._pending == 2
+
+        # A streaming client disconnecting while queued
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert pool._pending == 1
+
+        release.set()
+        await running
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool._pending == 0
+    assert pool.stats()["running"] == 0
+    assert not pool.is_full()
+
+
+def test_full_pool_rejects_then_recovers():
+    async def scenario():
+        pool = RequestPool(max_concurrency=1, max_queue=0)
+        slot = pool.slot()
+        with pytest.raises(Overloaded):
+            pool.slot()
+        async with slot:
+            pass
+        async with pool.slot():
+            pass
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool._pending == 0
+    assert pool.rejected == 1
+
+
+def test_run_coalesces_identical_requests():
+    async def scenario():
+        pool = RequestPool(max_concurrency=2, max_queue=4)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*[pool.run("same query", work) for _ in range(3)])
+        return pool, calls, results
+
+    pool, calls, results = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert pool.coalesced == 2
+    assert pool._pending == 0
@@ -0,0 +1,150 @@
+# utils/catalog.py
+
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from utils.lexical_index import BM25Index, index_path
+from utils.product_table import ProductTable
+
+# Relative to the working directory, same as the loader and search tool
+CHROMA_DIR = "../../db/chroma_product_store"
+
+
+def _generation_path(persist_directory: str) -> str:
+    # Kept next to (not inside) the store so it survives a full rebuild
+    return f"{os.path.normpath(persist_directory)}.generation"
+
+
+def read_generation(persist_directory: str = CHROMA_DIR) -> int:
+    path = _generation_path(persist_directory)
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation(persist_directory: str = CHROMA_DIR) -> int:
+    # Called by the indexer after every re-index so running readers reload
+    generation = read_generation(persist_directory) + 1
+    path = _generation_path(persist_directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+
+class CatalogView:
+    """One catalog generation, pinned for the length of a request."""
+
+    def __init__(self, catalog: "CatalogSnapshot", generation: int, state: Tuple):
+        self._catalog = catalog
+        self.generation = generation
+        self.ids, self.products, self._by_id, self.brands = state
+
+    @property
+    def table(self) -> ProductTable:
+        # Columnar view for whole-catalog filtering
+        return self._catalog._derived_for(self, "table", lambda: ProductTable(self.products, ids=self.ids))
+
+    @property
+    def lexical(self) -> BM25Index:
+        # BM25 index written by the loader next to the store
+        return self._catalog._derived_for(self, "lexical", lambda: self._catalog._load_lexical(self))
+
+    def get(self, product_id: str) -> Optional[Mapping[str, Any]]:
+        return self._by_id.get(product_id)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+class CatalogSnapshot:
+    """Read-only copy of the product metadata, loaded once per catalog generation.
+
+    Each accessor checks the generation file; a request should call view() once and
+    read everything from that, so it costs one check and never mixes generations.
+    """
+
+    def __init__(self, vectorstore, persist_directory: str = CHROMA_DIR):
+        self.vectorstore = vectorstore
+        self.persist_directory = persist_directory
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        # (ids, products, by_id, brands) swapped as one tuple so readers never see a mix
+        self._state = ((), (), MappingProxyType({}), ())
+        # Structures derived from the snapshot, built on first use: name -> (generation, value)
+        self._derived: Dict[str, Tuple[Optional[int], Any]] = {}
+
+    def _load(self, generation: int) -> None:
+        # Metadata only: no documents or embeddings are pulled out of Chroma
+        store_data = self.vectorstore.get(include=["metadatas"])
+        ids = tuple(store_data.get("ids") or ())
+        products = tuple(MappingProxyType(dict(m or {})) for m in store_data.get("metadatas") or ())
+        brands = tuple(sorted({p["brand"] for p in products if p.get("brand")}))
+        self._state = (ids, products, MappingProxyType(dict(zip(ids, products))), brands)
+        self._generation = generation
+
+    def view(self) -> CatalogView:
+        generation = read_generation(self.persist_directory)
+        with self._lock:
+            if generation != self._generation:
+                self._load(generation)
+            # Read together under the lock so the view's generation matches its state
+            return CatalogView(self, self._generation, self._state)
+
+    def refresh(self) -> int:
+        return self.view().generation
+
+    def _derived_for(self, view: CatalogView, name: str, build: Callable[[], Any]) -> Any:
+        cached = self._derived.get(name)
+        if cached is None or cached[0] != view.generation:
+            with self._lock:
+                cached = self._derived.get(name)
+                if cached is None or cached[0] != view.generation:
+                    cached = (view.generation, build())
+                    # An old request finishing late must not evict the current generation's copy
+                    current = self._derived.get(name)
+                    if current is None or current[0] is None or current[0] <= view.generation:
+                        self._derived[name] = cached
+        return cached[1]
+
+    def _load_lexical(self, view: CatalogView) -> BM25Index:
+        index = BM25Index.load(index_path(self.persist_directory))
+        if index is None or len(index) != len(view.ids):
+            # Sidecar missing or from another run: rebuild it from the snapshot
+            index = BM25Index.from_products(view.ids, view.products)
+        return index
+
+    # Single-value accessors; each one is a separate generation check
+    @property
+    def generation(self) -> int:
+        return self.refresh()
+
+    @property
+    def products(self) -> Tuple[Mapping[str, Any], ...]:
+        return self.view().products
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        return self.view().ids
+
+    @property
+    def brands(self) -> Tuple[str, ...]:
+        return self.view().brands
+
+    @property
+    def table(self) -> ProductTable:
+        return self.view().table
+
+    @property
+    def lexical(self) -> BM25Index:
+        return self.view().lexical
+
+    def get(self, product_id: str) -> Optional[Mapping[str, Any]]:
+        return self.view().get(product_id)
+
+    def __len__(self) -> int:
+        return len(self.view())
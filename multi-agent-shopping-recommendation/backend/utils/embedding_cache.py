@@ -0,0 +1,98 @@
+# utils/embedding_cache.py
+# The three apps are deployed and started separately (each from its own backend/)
+# and share no package, so each carries this module; keep the copies identical.
+
+import re
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    # all-MiniLM-L6-v2 is uncased, so lowercasing doesn't change the vector
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings instance and caches query vectors.
+
+    Keys are (model name, normalized text). Vectors live in an in-memory LRU and,
+    when `persist_path` is set, in SQLite as float32 blobs so they survive restarts.
+    Document embeddings (ingestion) pass straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, maxsize: int = 10000,
+                 persist_path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings (model TEXT, text TEXT, vector BLOB, PRIMARY KEY (model, text))"
+            )
+            self._db.commit()
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Same key as the SQLite table, so vectors of different models never mix
+        key = (self.model_name, normalize_text(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM query_embeddings WHERE model = ? AND text = ?", key
+                ).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+
+        # Compute outside the lock so other queries aren't serialized behind the model
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (model, text, vector) VALUES (?, ?, ?)",
+                    (*key, array("f", vector).tobytes()),
+                )
+                self._db.commit()
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "size": len(self._memory),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,146 @@
+# utils/lexical_index.py
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+# Reciprocal-rank fusion constant from the original RRF paper
+RRF_K = 60
+# Query-time cost bounds: terms in more than this share of products carry almost no
+# idf and are skipped, and at most this many postings (highest tf/length first) are
+# scored per term, so a query never walks the whole catalog
+MAX_DOC_FREQ_RATIO = 0.5
+MAX_POSTINGS_PER_TERM = 2000
+STOPWORDS = frozenset("""
+    a an and are as at be best buy by for from good i in is it me my need of on or
+    some that the to under want with
+""".split())
+
+_UNIT = re.compile(r"(\d+(?:\.\d+)?)\s*(gb|tb|mb|hz|ghz|mhz|inch|in|w|mp|k)\b")
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    # Glue numbers to their units so "16 GB" and "16GB" both become "16gb"
+    text = _UNIT.sub(r"\1\2", text.lower())
+    return _TOKEN.findall(text)
+
+
+def product_terms(product: Mapping) -> Counter:
+    features = product.get("features", [])
+    if isinstance(features, list):
+        features = " ".join(features)
+    return Counter(tokenize(f"{product.get('title', '')} {product.get('brand', '')} {features or ''}"))
+
+
+def index_path(persist_directory: str) -> str:
+    # Sidecar next to the Chroma store, like the generation counter
+    return f"{os.path.normpath(persist_directory)}.bm25.json"
+
+
+class BM25Index:
+    """In-process BM25 over product titles, brands and features, keyed by Chroma document id."""
+
+    def __init__(self, docs: Optional[Dict[str, Dict[str, int]]] = None):
+        self.docs: Dict[str, Dict[str, int]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # term -> postings sorted by tf/length (best first), built on first query of the term
+        self._ranked: Dict[str, List[Tuple[str, int]]] = {}
+        for doc_id, terms in (docs or {}).items():
+            self._add(doc_id, terms)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _add(self, doc_id: str, terms: Mapping[str, int]) -> None:
+        self.docs[doc_id] = dict(terms)
+        self.lengths[doc_id] = sum(terms.values())
+        self.total_length += self.lengths[doc_id]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+            self._ranked.pop(term, None)
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(doc_id)
+        for term in terms:
+            posting = self.postings.get(term)
+            self._ranked.pop(term, None)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def upsert(self, doc_id: str, product: Mapping) -> None:
+        self.remove(doc_id)
+        self._add(doc_id, product_terms(product))
+
+    def _top_postings(self, term: str) -> List[Tuple[str, int]]:
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            posting = self.postings[term]
+            ranked = heapq.nlargest(MAX_POSTINGS_PER_TERM, posting.items(),
+                                    key=lambda item: item[1] / self.lengths[item[0]])
+            self._ranked[term] = ranked
+        return ranked
+
+    def query_terms(self, query: str) -> List[str]:
+        """Query terms worth scoring: known, not stopwords, and not in most of the catalog."""
+        n = len(self.docs)
+        terms = [t for t in set(tokenize(query)) if t in self.postings and t not in STOPWORDS]
+        selective = [t for t in terms if len(self.postings[t]) <= MAX_DOC_FREQ_RATIO * n]
+        if selective or not terms:
+            return selective
+        # Only common terms ("laptop"): the rarest one still ranks, within the posting cap
+        return [min(terms, key=lambda t: len(self.postings[t]))]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_length = self.total_length / n
+        scores: Dict[str, float] = {}
+        for term in self.query_terms(query):
+            df = len(self.postings[term])
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, tf in self._top_postings(term):
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self.lengths[doc_id] / avg_length))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    @classmethod
+    def from_products(cls, ids: Sequence[str], products: Iterable[Mapping]) -> "BM25Index":
+        return cls({doc_id: product_terms(p) for doc_id, p in zip(ids, products)})
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        try:
+            with open(path, "r") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.docs, f)
+        os.replace(tmp_path, path)
+
+
+def reciprocal_rank_fusion(*rankings: Sequence[str], k: int = RRF_K) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
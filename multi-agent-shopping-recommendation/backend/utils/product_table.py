@@ -0,0 +1,139 @@
+# utils/product_table.py
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+
+# Compiled masks kept per table; a mask over 1M rows is ~1MB
+MASK_CACHE_SIZE = 32
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _features(product: Mapping[str, Any]) -> List[str]:
+    features = product.get("features", [])
+    if not isinstance(features, list):
+        features = (features or "").split(",")  # Chroma stores them comma-joined
+    return [f.strip().lower() for f in features if f and f.strip()]
+
+
+def matches(product: Mapping[str, Any], filters: Dict[str, Any]) -> bool:
+    """Row-at-a-time version of ProductTable.compile, for short candidate lists."""
+    price, rating = _number(product.get("price", 0)), _number(product.get("rating", 0))
+    if "min_price" in filters and price < filters["min_price"]:
+        return False
+    if "max_price" in filters and price > filters["max_price"]:
+        return False
+    if "min_rating" in filters and rating < filters["min_rating"]:
+        return False
+    if "brand" in filters:
+        brand = (product.get("brand", "") or "").lower()
+        if not any(b.lower() in brand for b in filters["brand"]):
+            return False
+    if "features" in filters:
+        features = set(_features(product))
+        if not all(f.lower() in features for f in filters["features"]):
+            return False
+    return True
+
+
+class ProductTable:
+    """Column-oriented view of a product list for vectorized filtering.
+
+    price/rating are float arrays, brands are interned to int codes and
+    features live in an inverted index (lowercased feature -> row ids).
+    """
+
+    def __init__(self, products: Sequence[Mapping[str, Any]], ids: Sequence[str] = ()):
+        self.rows = tuple(products)
+        # Product id -> row, so candidate lists can be checked against a cached mask
+        self.row_of: Dict[str, int] = {product_id: i for i, product_id in enumerate(ids)}
+        n = len(self.rows)
+        self.price = np.fromiter((_number(p.get("price", 0)) for p in self.rows), dtype=np.float64, count=n)
+        self.rating = np.fromiter((_number(p.get("rating", 0)) for p in self.rows), dtype=np.float64, count=n)
+
+        brand_codes: Dict[str, int] = {}
+        codes = np.empty(n, dtype=np.int32)
+        postings: Dict[str, List[int]] = {}
+        for i, product in enumerate(self.rows):
+            brand = product.get("brand", "") or ""
+            codes[i] = brand_codes.setdefault(brand, len(brand_codes))
+            for feature in set(_features(product)):
+                postings.setdefault(feature, []).append(i)
+
+        self.brand_codes = codes
+        self.brands: Tuple[str, ...] = tuple(brand_codes)
+        self.feature_index: Dict[str, np.ndarray] = {
+            feature: np.asarray(rows, dtype=np.int64) for feature, rows in postings.items()
+        }
+        # Filtering runs in worker threads (asyncio.to_thread), so the LRU is shared between them
+        self._mask_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._mask_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def _cache_key(filters: Dict[str, Any]) -> tuple:
+        return tuple(sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in filters.items()
+        ))
+
+    def compile(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Turn normalized filters (see filter_tool.normalize_filters) into a boolean row mask."""
+        key = self._cache_key(filters)
+        with self._mask_lock:
+            cached = self._mask_cache.get(key)
+            if cached is not None:
+                self._mask_cache.move_to_end(key)
+                return cached
+
+        mask = np.ones(len(self.rows), dtype=bool)
+        if "min_price" in filters:
+            mask &= self.price >= filters["min_price"]
+        if "max_price" in filters:
+            mask &= self.price <= filters["max_price"]
+        if "min_rating" in filters:
+            mask &= self.rating >= filters["min_rating"]
+        if "brand" in filters:
+            requested = [b.lower() for b in filters["brand"]]
+            # Resolve against the (small) brand vocabulary, then one gather over all rows
+            allowed = np.fromiter((any(r in brand.lower() for r in requested) for brand in self.brands),
+                                  dtype=bool, count=len(self.brands))
+            mask &= allowed[self.brand_codes]
+        for feature in filters.get("features", []):
+            rows: Optional[np.ndarray] = self.feature_index.get(feature.lower())
+            feature_mask = np.zeros(len(self.rows), dtype=bool)
+            if rows is not None:
+                feature_mask[rows] = True
+            mask &= feature_mask
+
+        mask.setflags(write=False)
+        # Built outside the lock; two threads compiling the same filters just store equal masks
+        with self._mask_lock:
+            self._mask_cache[key] = mask
+            self._mask_cache.move_to_end(key)
+            if len(self._mask_cache) > MASK_CACHE_SIZE:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    def select(self, filters: Dict[str, Any]) -> List[Mapping[str, Any]]:
+        return [self.rows[i] for i in np.flatnonzero(self.compile(filters))]
+
+    def filter_candidates(self, candidates: Sequence[Mapping[str, Any]], filters: Dict[str, Any]) -> List[Mapping[str, Any]]:
+        """Keep candidates (dicts with an "id") whose catalog row passes the filters, in their order."""
+        mask = self.compile(filters)
+        kept = []
+        for product in candidates:
+            row = self.row_of.get(product.get("id"))
+            # Products the table doesn't know (e.g. added after this generation) are checked directly
+            if (mask[row] if row is not None else matches(product, filters)):
+                kept.append(product)
+        return kept
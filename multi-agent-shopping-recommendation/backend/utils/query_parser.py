@@ -0,0 +1,142 @@
+# utils/query_parser.py
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Below this confidence the rule-based intent is discarded and the LLM is asked instead
+RULE_CONFIDENCE_THRESHOLD = 0.8
+# Descriptive words we leave to the semantic search before we stop trusting the rules
+MAX_RESIDUAL_WORDS = 6
+
+_NUM = r"(\d[\d,]*(?:\.\d+)?)(k)?(?!\s*(?:gb|tb|hz|mp|w\b|inch|in\b|\"|%))"
+
+_RATING_PATTERNS = [
+    re.compile(r"\b(?:rated|rating(?:\s+of)?)\s+(?:at\s+least\s+|above\s+|over\s+|>=?\s*)?(\d(?:\.\d)?)\s*(?:\+|stars?|/\s*5)?"),
+    re.compile(r"\b(?:at\s+least\s+)?(\d(?:\.\d)?)\s*\+?\s*stars?(?:\s+(?:and|or)\s+(?:up|above|more|higher))?"),
+]
+_RANGE_PATTERNS = [
+    re.compile(rf"\bbetween\s+{_NUM}\s+(?:and|to|-)\s+{_NUM}"),
+    re.compile(rf"\b(?:from\s+)?{_NUM}\s*(?:-|to)\s*{_NUM}"),
+]
+_MAX_PATTERN = re.compile(
+    rf"\b(?:under|below|less\s+than|cheaper\s+than|no\s+more\s+than|max(?:imum)?|up\s*to|within|budget(?:\s+of)?)\s+{_NUM}|<=?\s*{_NUM}"
+)
+_MIN_PATTERN = re.compile(
+    rf"\b(?:over|above|more\s+than|at\s+least|min(?:imum)?|starting\s+at)\s+{_NUM}|>=?\s*{_NUM}"
+)
+
+_STOPWORDS = {
+    "a", "an", "the", "me", "i", "my", "for", "with", "and", "or", "of", "in", "on", "to", "some",
+    "find", "show", "get", "want", "need", "looking", "search", "buy", "please", "good", "best",
+    "that", "has", "have", "is", "it", "by", "from", "price", "priced", "cost", "costs", "dollars", "usd",
+}
+_UNSAFE_WORDS = {
+    "not", "no", "except", "excluding", "without", "non", "but",
+    "under", "below", "above", "over", "between", "cheaper", "less", "more", "than",
+    "rated", "rating", "stars", "star", "around", "about", "approximately",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form used as a cache key: 'Laptop under 1,000$ ' -> 'laptop under 1000'."""
+    text = query.lower().strip()
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)
+    text = re.sub(r"\$\s*(?=\d)", "", text)
+    text = re.sub(r"(?<=\d)\s*\$", "", text)
+    text = re.sub(r"(?<=\d)\s*(?:dollars|usd)\b", "", text)
+    text = re.sub(r"[?!.,;]+(\s|$)", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _amount(number: str, thousands: str) -> float:
+    value = float(number.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+def _first_number(match: "re.Match") -> Tuple[str, str]:
+    groups = [g for g in match.groups()]
+    for i in range(0, len(groups), 2):
+        if groups[i] is not None:
+            return groups[i], groups[i + 1]
+    raise ValueError("no number in match")
+
+
+def _cut(text: str, match: "re.Match") -> str:
+    return text[:match.start()] + " " + text[match.end():]
+
+
+def _ngrams(tokens: List[str], max_n: int = 4) -> Iterable[Tuple[int, int, str]]:
+    for n in range(max_n, 0, -1):
+        for i in range(len(tokens) - n + 1):
+            yield i, i + n, " ".join(tokens[i:i + n])
+
+
+def rule_based_intent(query: str, brands: Iterable[str], features: Iterable[str]) -> Tuple[Dict[str, Any], float]:
+    """Deterministic intent extraction for simple queries.
+
+    `brands` and `features` are the catalog vocabularies; only exact (case-insensitive)
+    mentions are picked up so the result is always compatible with the filter tool.
+    Returns (intent, confidence in [0, 1]).
+    """
+    text = normalize_query(query)
+    intent: Dict[str, Any] = {}
+
+    # Catalog brands and features, longest phrase first
+    brand_lookup = {b.lower(): b for b in brands}
+    feature_lookup = {f.lower(): f for f in features}
+    tokens = text.split(" ")
+    used = [False] * len(tokens)
+    found_brands, found_features = [], []
+    for start, end, phrase in _ngrams(tokens):
+        if any(used[start:end]):
+            continue
+        if phrase in brand_lookup:
+            found_brands.append(brand_lookup[phrase])
+        elif phrase in feature_lookup:
+            found_features.append(feature_lookup[phrase])
+        else:
+            continue
+        used[start:end] = [True] * (end - start)
+    text = " ".join(t for t, u in zip(tokens, used) if not u)
+    if found_brands:
+        intent["brand"] = found_brands[0] if len(found_brands) == 1 else found_brands
+    if found_features:
+        intent["features"] = found_features
+
+    for pattern in _RATING_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            rating = float(match.group(1))
+            if rating <= 5:
+                intent["min_rating"] = rating
+                text = _cut(text, match)
+            break
+
+    for pattern in _RANGE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            low = _amount(match.group(1), match.group(2))
+            high = _amount(match.group(3), match.group(4))
+            intent["min_price"], intent["max_price"] = min(low, high), max(low, high)
+            text = _cut(text, match)
+            break
+    else:
+        match = _MAX_PATTERN.search(text)
+        if match:
+            intent["max_price"] = _amount(*_first_number(match))
+            text = _cut(text, match)
+        match = _MIN_PATTERN.search(text)
+        if match:
+            intent["min_price"] = _amount(*_first_number(match))
+            text = _cut(text, match)
+
+    # Whatever is left must be harmless description for the rules to be trusted
+    residual = [w for w in re.findall(r"[a-z0-9+<>=$.\-]+", text) if w not in _STOPWORDS]
+    confidence = 1.0
+    if any(re.search(r"\d", w) for w in residual) or any(w in _UNSAFE_WORDS for w in residual):
+        confidence = 0.0
+    elif len(residual) > MAX_RESIDUAL_WORDS:
+        confidence = max(0.0, 1.0 - 0.1 * (len(residual) - MAX_RESIDUAL_WORDS))
+    if "min_price" in intent and "max_price" in intent and intent["min_price"] > intent["max_price"]:
+        confidence = 0.0
+    return intent, confidence
@@ -0,0 +1,122 @@
+# utils/request_pool.py
+
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """Raised when the wait queue is full; `retry_after` is a hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many pending requests, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Slot:
+    def __init__(self, pool: "RequestPool"):
+        self.pool = pool
+        self.started = 0.0
+        self._reserved = True  # counted in pool._pending until released
+
+    def release_reservation(self) -> None:
+        # Idempotent, so every exit path can call it
+        if self._reserved:
+            self._reserved = False
+            self.pool._pending -= 1
+
+    async def __aenter__(self):
+        try:
+            await self.pool._semaphore.acquire()
+        except BaseException:
+            # Cancelled while queued (e.g. the client disconnected): give the place back
+            self.release_reservation()
+            raise
+        self.started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool._semaphore.release()
+        self.release_reservation()
+        self.pool._observe(time.perf_counter() - self.started)
+        return False
+
+
+class RequestPool:
+    """Admission control for LLM-bound requests.
+
+    At most `max_concurrency` requests run at once (match Ollama's parallelism),
+    up to `max_queue` more wait, and anything beyond that is rejected with
+    Overloaded. Identical in-flight requests share one computation via `run`.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 16):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        # Blocking work (the LangChain agent) runs here instead of on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="recommend")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending = 0
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        self._avg_seconds = 5.0
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _observe(self, seconds: float) -> None:
+        self.completed += 1
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        waves = (self._pending - self.max_concurrency + 1) / self.max_concurrency
+        return max(1, math.ceil(self._avg_seconds * max(waves, 1)))
+
+    def is_full(self) -> bool:
+        return self._pending >= self.max_concurrency + self.max_queue
+
+    def slot(self) -> _Slot:
+        """Reserve a place in the queue (or raise Overloaded); `async with` it to run."""
+        if self.is_full():
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        self._pending += 1
+        return _Slot(self)
+
+    async def _run(self, key: str, slot: _Slot, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            async with slot:
+                return await fn()
+        finally:
+            slot.release_reservation()
+            self._inflight.pop(key, None)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, self.slot(), fn))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shielded so one client disconnecting doesn't cancel the work others wait on
+        return await asyncio.shield(task)
+
+    async def run_blocking(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": min(self._pending, self.max_concurrency),
+            "queued": max(0, self._pending - self.max_concurrency),
+            "in_flight_keys": len(self._inflight),
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "avg_seconds": self._avg_seconds,
+        }
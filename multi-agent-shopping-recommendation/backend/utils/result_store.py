@@ -0,0 +1,30 @@
+# utils/result_store.py
+
+import uuid
+from typing import Dict, List, Optional
+from utils.ttl_cache import TTLCache
+
+# Result sets only need to outlive one agent run
+RESULT_TTL_SECONDS = 600
+MAX_RESULT_SETS = 1000
+
+_results = TTLCache(maxsize=MAX_RESULT_SETS, ttl=RESULT_TTL_SECONDS)
+
+
+def put_results(products: List[Dict]) -> Dict:
+    """Store a product list server-side and return the compact handle the agent passes around."""
+    result_id = uuid.uuid4().hex[:12]
+    _results.set(result_id, list(products))
+    return {"result_id": result_id, "count": len(products)}
+
+
+def get_results(result_id: str) -> Optional[List[Dict]]:
+    return _results.get(result_id)
+
+
+def resolve_products(data: Dict) -> Optional[List[Dict]]:
+    # Tool input may carry a handle or (older prompts) the product list itself
+    if "result_id" in data:
+        return get_results(str(data["result_id"]))
+    products = data.get("products", [])
+    return products if isinstance(products, list) else None
@@ -1,5 +1,6 @@
 # frontend/app.py
 
+import json
 import streamlit as st
 import requests
 
@@ -9,12 +10,36 @@ query = st.text_input("What are you looking for?")
 
 if st.button("Find Products"):
     if query:
-        with st.spinner("Thinking..."):
-            response = requests.post(
-                "http://localhost:8000/recommend",
-                json={"query": query}
-            )
-            if response.status_code == 200:
-                st.markdown(response.json().get("response", "No products found."))
-            else:
+        products_area = st.empty()
+        answer_area = st.empty()
+        answer = ""
+        try:
+            with st.spinner("Thinking..."):
+                response = requests.post(
+                    "http://localhost:8000/recommend/stream",
+                    json={"query": query},
+                    stream=True
+                )
+            if response.status_code == 429:
+                st.warning(f"The assistant is busy, please retry in {response.headers.get('Retry-After', 'a few')} seconds.")
+            elif response.status_code != 200:
                 st.error("Failed to get a response from the assistant.")
+            else:
+                # Newline-delimited JSON: the matched products arrive first, then the answer tokens
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "products":
+                        with products_area.container():
+                            st.caption(f"Matched {len(event['products'])} products")
+                            for p in event["products"]:
+                                st.markdown(f"- [{p['title']}]({p['url']}) — ${p['price']}, {p['rating']}⭐")
+                    elif event["type"] == "error":
+                        st.warning(event.get("detail", "The assistant is busy, please retry shortly."))
+                    elif event["type"] == "token":
+                        answer += event["text"]
+                        answer_area.markdown(answer + "▌")
+                answer_area.markdown(answer or "No products found.")
+        except requests.RequestException:
+            st.error("Failed to get a response from the assistant.")
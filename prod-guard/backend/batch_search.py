@@ -0,0 +1,85 @@
+# batch_search.py
+# Helpers for /search/batch: collapse an alert storm to its distinct error lines,
+# so one embed call and one multi-vector Chroma query serve the whole batch, and
+# rank the incidents implicated across all of them.
+
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+NEAR_DUPLICATE_SIMILARITY = 0.97  # cosine similarity above which two queries share one search
+
+# Volatile tokens that differ between otherwise identical alert lines. Only whole tokens
+# are masked: status and error codes (HTTP 502, ORA-00942), versions (ipv4) and device
+# names (/dev/sda1) tell alerts apart and are kept.
+_VOLATILE = re.compile(
+    r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"           # UUIDs
+    r"|\b\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?\b"  # ISO timestamps
+    r"|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"                                        # times of day
+    r"|\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"                                      # IPv4, with port
+    r"|\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b"                                          # addresses, hashes
+    r"|\b\d{6,}\b"                                                                # request ids, pids
+)
+
+
+def normalize_alert(text: str) -> str:
+    text = _VOLATILE.sub("#", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def dedupe_exact(queries: List[str]) -> Tuple[List[str], List[int]]:
+    """Return (distinct queries, index of each input query's distinct entry)."""
+    distinct: List[str] = []
+    positions: Dict[str, int] = {}
+    mapping = []
+    for query in queries:
+        key = normalize_alert(query)
+        if key not in positions:
+            positions[key] = len(distinct)
+            distinct.append(query)
+        mapping.append(positions[key])
+    return distinct, mapping
+
+
+def dedupe_near(vectors: List[List[float]], threshold: float = NEAR_DUPLICATE_SIMILARITY) -> List[int]:
+    """Greedy clustering: map each vector to the first earlier representative it is this similar to."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    similarities = matrix @ matrix.T
+    representative = list(range(len(vectors)))
+    representatives: List[int] = []
+    for i in range(len(vectors)):
+        if representatives:
+            scores = similarities[i, representatives]
+            best = int(scores.argmax())
+            if scores[best] >= threshold:
+                representative[i] = representatives[best]
+                continue
+        representatives.append(i)
+    return representative
+
+
+def implicated_incidents(per_query_hits: List[List[Dict]], weights: List[int], threshold: float,
+                         limit: int) -> List[Dict]:
+    """Rank incidents by how many input queries hit them, then by summed margin below the threshold.
+
+    per_query_hits holds each searched query's hits (dicts with jira_id and distance);
+    weights says how many input queries each searched query stands for.
+    """
+    incidents: Dict[str, Dict] = {}
+    for hits, weight in zip(per_query_hits, weights):
+        best: Dict[str, float] = {}
+        for hit in hits:
+            jira_id = hit["jira_id"]
+            best[jira_id] = min(hit["distance"], best.get(jira_id, hit["distance"]))
+        # An incident counts once per query, with its best chunk
+        for jira_id, distance in best.items():
+            entry = incidents.setdefault(jira_id, {"jira_id": jira_id, "queries": 0, "score": 0.0,
+                                                   "best_distance": distance})
+            entry["queries"] += weight
+            entry["score"] += weight * (threshold - distance)
+            entry["best_distance"] = min(entry["best_distance"], distance)
+    ranked = sorted(incidents.values(), key=lambda e: (e["queries"], e["score"]), reverse=True)
+    return ranked[:limit]
@@ -0,0 +1,86 @@
+# benchmarks/bench_batch_search.py
+#
+# Alert-storm throughput: N separate embed_query + collection.query calls (what the
+# pager integration did through /search) vs one deduplicated embed_documents call
+# and one multi-vector collection.query (what /search/batch does). Queries are
+# generated from the bundled dataset with volatile ids/numbers, so many of them
+# collapse to the same alert line, as in a real storm.
+# Run from backend/:  python -m benchmarks.bench_batch_search --chunks 100000 --batches 10,100,500
+# --random-vectors swaps the model for langchain's FakeEmbeddings: exact dedupe and
+# the single multi-vector query are measured, but embedding time is left out and no
+# two random vectors are near-duplicates.
+#
+# --random-vectors --chunks 100000 (chromadb 1.5.9, one CPU):
+#  queries  distinct  one-by-one s   batch s  q/s single  q/s batch
+#       10        10          0.03      0.02       328.2      630.2
+#      100        94          0.22      0.12       459.7      844.7
+#      500       389          1.21      0.44       414.1     1132.6
+# Not yet run with the model.
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import chromadb
+from langchain_community.embeddings import FakeEmbeddings, HuggingFaceEmbeddings
+
+from batch_search import dedupe_exact, dedupe_near
+from json_stream import iter_json_records
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../dataset/incident_records.json")
+ADD_BATCH_SIZE = 5000
+TOP_K = 5
+
+
+def alert_storm(size: int):
+    lines = [r["error_description"] for r in iter_json_records(DATA_PATH)]
+    return [f"{random.choice(lines)} host=web-{random.randint(1, 40)} req={random.getrandbits(64):x}"
+            for _ in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--batches", default="10,100,500")
+    parser.add_argument("--random-vectors", action="store_true", help="don't load the embedding model")
+    args = parser.parse_args()
+
+    if args.random_vectors:
+        embeddings = FakeEmbeddings(size=384)
+    else:
+        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    dim = len(embeddings.embed_query("probe"))
+    workdir = tempfile.mkdtemp(prefix="bench_batch_search_")
+    collection = chromadb.PersistentClient(path=workdir).get_or_create_collection("incident_records")
+    for start in range(0, args.chunks, ADD_BATCH_SIZE):
+        ids = range(start, min(start + ADD_BATCH_SIZE, args.chunks))
+        collection.add(ids=[f"INC-{i}_0" for i in ids],
+                       embeddings=[[random.gauss(0, 1) for _ in range(dim)] for _ in ids],
+                       metadatas=[{"jira_id": f"INC-{i}", "chunk_index": 0} for i in ids])
+
+    print(f"{'queries':>8} {'distinct':>9} {'one-by-one s':>13} {'batch s':>9} {'q/s single':>11} {'q/s batch':>10}")
+    for size in (int(b) for b in args.batches.split(",")):
+        queries = alert_storm(size)
+
+        started = time.perf_counter()
+        for query in queries:
+            collection.query(query_embeddings=[embeddings.embed_query(query)], n_results=TOP_K)
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        distinct, _ = dedupe_exact(queries)
+        vectors = embeddings.embed_documents(distinct)
+        searched = sorted(set(dedupe_near(vectors)))
+        collection.query(query_embeddings=[vectors[i] for i in searched], n_results=TOP_K)
+        batch = time.perf_counter() - started
+
+        print(f"{size:>8} {len(distinct):>9} {single:>13.2f} {batch:>9.2f} {size / single:>11.1f} {size / batch:>10.1f}")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
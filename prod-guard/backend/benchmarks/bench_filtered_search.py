@@ -0,0 +1,100 @@
+# benchmarks/bench_filtered_search.py
+#
+# /search latency with and without structured filters as the collection grows.
+# Chunks get random vectors and metadata shaped like ingest's (status, error_type,
+# jira_project, timestamp_epoch); the collection is grown in place, and at every
+# size each filter set is timed over the same random queries.
+# Run from backend/:  python -m benchmarks.bench_filtered_search --sizes 100000,1000000,3000000
+#
+# --sizes 100000,300000 (chromadb 1.5.9, one CPU):
+#     chunks filter                     p50 ms   p95 ms   hits
+#     100000 unfiltered                    2.7      3.1    5.0
+#     100000 open, last 90 days          148.4    159.0    5.0
+#     100000 production + project        121.1    130.6    5.0
+#     100000 open production, 90d        219.4    241.4    5.0
+#     300000 unfiltered                    3.0      3.8    5.0
+#     300000 open, last 90 days          382.3    425.6    5.0
+#     300000 production + project        334.7    347.4    5.0
+#     300000 open production, 90d        653.7    707.2    5.0
+# Filtered queries grow linearly with the collection (about 2 ms per 1000 chunks),
+# unlike the HNSW-backed unfiltered ones.
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import chromadb
+
+from incident_search import compile_where
+
+DIM = 384
+ADD_BATCH_SIZE = 5000
+QUERIES = 30
+TOP_K = 5
+STATUSES = ["Open", "In Progress", "Closed", "Resolved"]
+ERROR_TYPES = ["Production", "QA", "Development", "Staging", "Infra", "Security"]
+PROJECTS = ["JIRA", "OPS", "PAY", "CORE", "WEB"]
+NOW = time.time()
+YEAR = 365 * 86400
+
+FILTERS = {
+    "unfiltered": {},
+    "open, last 90 days": {"status": ["Open"], "since": NOW - 90 * 86400},
+    "production + project": {"error_type": ["Production"], "jira_project": "PAY"},
+    "open production, 90d": {"status": ["Open", "In Progress"], "error_type": ["Production"],
+                             "since": NOW - 90 * 86400},
+}
+
+
+def add_chunks(collection, start: int, end: int) -> None:
+    for offset in range(start, end, ADD_BATCH_SIZE):
+        ids = range(offset, min(offset + ADD_BATCH_SIZE, end))
+        collection.add(
+            ids=[f"INC-{i}_0" for i in ids],
+            embeddings=[[random.random() for _ in range(DIM)] for _ in ids],
+            metadatas=[{
+                "jira_id": f"INC-{i}",
+                "chunk_index": 0,
+                "jira_project": random.choice(PROJECTS),
+                "status": random.choice(STATUSES),
+                "error_type": random.choice(ERROR_TYPES),
+                "timestamp_epoch": NOW - random.random() * 2 * YEAR,
+            } for i in ids],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated collection sizes")
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+
+    workdir = tempfile.mkdtemp(prefix="bench_filtered_search_")
+    collection = chromadb.PersistentClient(path=workdir).get_or_create_collection("incident_records")
+    queries = [[random.random() for _ in range(DIM)] for _ in range(QUERIES)]
+
+    print(f"{'chunks':>10} {'filter':<24} {'p50 ms':>8} {'p95 ms':>8} {'hits':>6}")
+    added = 0
+    for size in sizes:
+        add_chunks(collection, added, size)
+        added = size
+        for name, filters in FILTERS.items():
+            where = compile_where(**filters)
+            latencies, hits = [], 0
+            for query in queries:
+                started = time.perf_counter()
+                results = collection.query(query_embeddings=[query], n_results=TOP_K, where=where)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(results["ids"][0])
+            latencies.sort()
+            print(f"{size:>10} {name:<24} {statistics.median(latencies):>8.1f} "
+                  f"{latencies[int(len(latencies) * 0.95) - 1]:>8.1f} {hits / QUERIES:>6.1f}")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
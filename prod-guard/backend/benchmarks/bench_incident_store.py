@@ -0,0 +1,129 @@
+# benchmarks/bench_incident_store.py
+#
+# Disk and payload size of the old layout (every chunk carries its incident's full
+# fields in Chroma metadata) vs the compact one (chunks carry jira_id, chunk_index
+# and the short filter fields; incident fields live once in incidents.sqlite3). The
+# bundled dataset is scaled up by cloning records under new jira_ids; --repeat
+# lengthens descriptions so incidents span several chunks. Vectors are random, so no
+# model is loaded.
+# Run from backend/:  python -m benchmarks.bench_incident_store --scale 200 --repeat 8
+#
+# 10000 incidents, 20000 chunks (chromadb 1.5.9):
+#                                              legacy    compact   change
+# ingest seconds                                34.11      31.44    -7.9%
+# disk MB (chroma + incidents.sqlite3)          96.68      76.24   -21.1%
+# chunk metadata MB (collection.get)            12.96       2.99   -76.9%
+# 50 search responses KB                       222.82     261.50    17.4%
+# Random query vectors rarely return two chunks of one incident, so the response
+# has nothing to deduplicate and pays for the filter fields on each hit instead.
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+import chromadb
+
+from incident_ingest import ingest_records, iter_batches, sanitize_metadata_value
+from incident_store import IncidentStore
+from json_stream import iter_json_records
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../dataset/incident_records.json")
+DIM = 384
+QUERIES = 50
+
+
+class RandomEmbeddings:
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[random.random() for _ in range(DIM)] for _ in texts]
+
+
+def scaled_records(scale: int, repeat: int) -> Iterator[Dict]:
+    base = list(iter_json_records(DATA_PATH))
+    for copy in range(scale):
+        for record in base:
+            yield {
+                **record,
+                "jira_id": f"{record['jira_id']}-{copy}",
+                "error_description": " ".join([record["error_description"]] * repeat),
+            }
+
+
+def legacy_ingest(records, collection) -> None:
+    # The previous per-chunk metadata layout
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
+    embeddings = RandomEmbeddings()
+    for batch in iter_batches(records, splitter, {"skipped_records": 0}):
+        full = {i["jira_id"]: i for i in batch.incidents}
+        metadatas = [
+            {**{k: sanitize_metadata_value(v) for k, v in full[m["jira_id"]].items() if k != "chunk_count"},
+             "chunk_index": m["chunk_index"]}
+            for m in batch.metadatas
+        ]
+        collection.upsert(ids=batch.ids, documents=batch.texts, metadatas=metadatas,
+                          embeddings=embeddings.embed_documents(batch.texts))
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def search_payload(collection, store: Optional[IncidentStore] = None) -> int:
+    # JSON bytes of QUERIES top-5 /search responses, shaped the way the endpoint returns them:
+    # the compact layout sends each incident's fields once, under "incidents"
+    total = 0
+    for _ in range(QUERIES):
+        results = collection.query(query_embeddings=[[random.random() for _ in range(DIM)]], n_results=5)
+        metas = results["metadatas"][0]
+        response = {"results": [{"document": d, "metadata": m} for d, m in zip(results["documents"][0], metas)]}
+        if store is not None:
+            response["incidents"] = store.get_many(m["jira_id"] for m in metas)
+        total += len(json.dumps(response))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=200, help="copies of the bundled dataset")
+    parser.add_argument("--repeat", type=int, default=8, help="times each description is repeated")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="bench_incident_store_")
+
+    legacy_dir = os.path.join(workdir, "legacy")
+    legacy = chromadb.PersistentClient(path=legacy_dir).get_or_create_collection("incident_records")
+    started = time.perf_counter()
+    legacy_ingest(scaled_records(args.scale, args.repeat), legacy)
+    legacy_seconds = time.perf_counter() - started
+
+    compact_dir = os.path.join(workdir, "compact")
+    compact = chromadb.PersistentClient(path=compact_dir).get_or_create_collection("incident_records")
+    store = IncidentStore(os.path.join(compact_dir, "incidents.sqlite3"))
+    started = time.perf_counter()
+    for _ in ingest_records(scaled_records(args.scale, args.repeat), compact, RandomEmbeddings(), store):
+        pass
+    compact_seconds = time.perf_counter() - started
+
+    chunks = compact.count()
+    legacy_meta = len(json.dumps(legacy.get(include=["metadatas"])["metadatas"]))
+    compact_meta = len(json.dumps(compact.get(include=["metadatas"])["metadatas"]))
+    rows = [
+        ("ingest seconds", legacy_seconds, compact_seconds),
+        ("disk MB (chroma + incidents.sqlite3)", dir_size(legacy_dir) / 1e6, dir_size(compact_dir) / 1e6),
+        ("chunk metadata MB (collection.get)", legacy_meta / 1e6, compact_meta / 1e6),
+        (f"{QUERIES} search responses KB", search_payload(legacy) / 1e3, search_payload(compact, store) / 1e3),
+    ]
+    print(f"{store.stats()['incidents']} incidents, {chunks} chunks")
+    print(f"{'':<40} {'legacy':>10} {'compact':>10} {'change':>8}")
+    for name, old, new in rows:
+        print(f"{name:<40} {old:>10.2f} {new:>10.2f} {(new - old) / old * 100:>7.1f}%")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# incident_ingest.py
+# Streaming bulk ingest for /upload-json: records are read one at a time, chunked
+# with a shared splitter, embedded in fixed-size batches and upserted batch by
+# batch, so memory stays bounded whatever the size of the export. Incident fields
+# go to the IncidentStore once per record; chunks keep their jira_id plus the few
+# short fields /search filters on.
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from incident_store import INCIDENT_FIELDS, IncidentStore
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+BATCH_SIZE = 256   # chunks per embed_documents call and per Chroma upsert
+BACKFILL_PAGE_SIZE = 5000
+
+
+def sanitize_metadata_value(value):
+    return value if value is not None else "unknown"
+
+
+def to_epoch(value) -> Optional[float]:
+    # ISO-8601 timestamps; naive ones are taken as UTC
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def jira_project(jira_id: str) -> str:
+    return str(jira_id).split("-", 1)[0]
+
+
+def chunk_metadata(record: Dict, idx: int) -> Dict:
+    # Only the short fields /search filters on; everything else is in the IncidentStore
+    metadata = {
+        "jira_id": record["jira_id"],
+        "chunk_index": idx,
+        "jira_project": jira_project(record["jira_id"]),
+        "status": sanitize_metadata_value(record.get("status")),
+        "error_type": sanitize_metadata_value(record.get("error_type")),
+    }
+    epoch = to_epoch(record.get("timestamp"))
+    if epoch is not None:
+        # Records without a parseable timestamp are left out of time-window searches
+        metadata["timestamp_epoch"] = epoch
+    return metadata
+
+
+def backfill_filter_metadata(collection, incident_store: IncidentStore, page_size: int = BACKFILL_PAGE_SIZE) -> int:
+    """Add the /search filter fields to chunks stored before they existed; returns how many were updated."""
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        legacy = [(chunk_id, meta or {}) for chunk_id, meta in zip(page["ids"], page["metadatas"])
+                  if "jira_project" not in (meta or {})]
+        if legacy:
+            # Chunk IDs are {jira_id}_{idx}; old chunks carry the incident fields themselves,
+            # newer ones find them in the store
+            keys = [chunk_id.rsplit("_", 1) for chunk_id, _ in legacy]
+            incidents = incident_store.get_many(meta.get("jira_id") or key[0] for (_, meta), key in zip(legacy, keys))
+            ids, metadatas = [], []
+            for (chunk_id, meta), key in zip(legacy, keys):
+                jira_id = meta.get("jira_id") or key[0]
+                idx = meta.get("chunk_index", int(key[1]) if len(key) == 2 and key[1].isdigit() else 0)
+                record = {**meta, **incidents.get(jira_id, {}), "jira_id": jira_id}
+                ids.append(chunk_id)
+                metadatas.append({**meta, **chunk_metadata(record, idx)})
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+        if len(page["ids"]) < page_size:
+            return updated
+        offset += page_size
+
+
+def incident_row(record: Dict, text: str, chunk_count: int) -> Dict:
+    row = {field: sanitize_metadata_value(record.get(field)) for field in INCIDENT_FIELDS}
+    row.update(jira_id=record["jira_id"], error_description=text, chunk_count=chunk_count)
+    return row
+
+
+class Batch:
+    def __init__(self):
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.jira_ids: List[str] = []
+        self.incidents: List[Dict] = []
+        self.records = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def iter_batches(records: Iterable[Dict], splitter: RecursiveCharacterTextSplitter, stats: Dict,
+                 batch_size: int = BATCH_SIZE) -> Iterator[Batch]:
+    # A record's chunks never straddle two batches, so stale-chunk cleanup sees the whole record
+    batch = Batch()
+    for record in records:
+        text = record.get("error_description", "") or ""
+        jira_id = record.get("jira_id")
+        if not text.strip() or not jira_id:
+            # Without a jira_id there is no stable chunk ID to upsert under
+            stats["skipped_records"] += 1
+            continue
+        chunks = splitter.split_text(text)
+        if batch and (len(batch) + len(chunks) > batch_size or jira_id in batch.jira_ids):
+            yield batch
+            batch = Batch()
+        for idx, chunk in enumerate(chunks):
+            batch.ids.append(f"{jira_id}_{idx}")
+            batch.texts.append(chunk)
+            batch.metadatas.append(chunk_metadata(record, idx))
+        batch.jira_ids.append(jira_id)
+        batch.incidents.append(incident_row(record, text, len(chunks)))
+        batch.records += 1
+    if batch:
+        yield batch
+
+
+def stale_chunk_ids(batch: Batch, collection, incident_store: IncidentStore) -> List[str]:
+    # Chunk IDs are {jira_id}_{idx}, so the stored chunk count says exactly what to drop
+    known = incident_store.chunk_counts(batch.jira_ids)
+    stale = [
+        f"{incident['jira_id']}_{idx}"
+        for incident in batch.incidents if incident["jira_id"] in known
+        for idx in range(incident["chunk_count"], known[incident["jira_id"]])
+    ]
+    # Incidents not in the store may still have chunks from before it existed
+    unknown = [jira_id for jira_id in batch.jira_ids if jira_id not in known]
+    if unknown:
+        existing = collection.get(where={"jira_id": {"$in": unknown}}, include=[])["ids"]
+        stale += list(set(existing) - set(batch.ids))
+    return stale
+
+
+def ingest_records(records: Iterable[Dict], collection, embeddings, incident_store: IncidentStore,
+                   batch_size: int = BATCH_SIZE) -> Iterator[Dict]:
+    """Embed and upsert records batch by batch; yields one progress dict per batch, then a summary."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    stats = {"skipped_records": 0}
+    started = time.perf_counter()
+    total_records = total_chunks = total_stale = 0
+
+    for number, batch in enumerate(iter_batches(records, splitter, stats, batch_size), start=1):
+        batch_started = time.perf_counter()
+        vectors = embeddings.embed_documents(batch.texts)
+        embed_seconds = time.perf_counter() - batch_started
+
+        # Re-uploads overwrite chunks in place; chunks past a record's new length are removed
+        stale = stale_chunk_ids(batch, collection, incident_store)
+        if stale:
+            collection.delete(ids=stale)
+        collection.upsert(ids=batch.ids, documents=batch.texts, metadatas=batch.metadatas, embeddings=vectors)
+        incident_store.upsert_many(batch.incidents)
+
+        seconds = time.perf_counter() - batch_started
+        total_records += batch.records
+        total_chunks += len(batch)
+        total_stale += len(stale)
+        yield {
+            "type": "batch",
+            "batch": number,
+            "records": batch.records,
+            "chunks": len(batch),
+            "stale_chunks_deleted": len(stale),
+            "embed_seconds": round(embed_seconds, 3),
+            "seconds": round(seconds, 3),
+            "chunks_per_second": round(len(batch) / seconds, 1) if seconds else None,
+            "records_total": total_records,
+            "chunks_total": total_chunks,
+        }
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Ingested {total_records} records / {total_chunks} chunks in {elapsed:.1f}s")
+    yield {
+        "type": "done",
+        "message": f"Uploaded and stored {total_chunks} chunks.",
+        "records": total_records,
+        "chunks": total_chunks,
+        "stale_chunks_deleted": total_stale,
+        "skipped_records": stats["skipped_records"],
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(total_chunks / elapsed, 1) if elapsed else None,
+    }
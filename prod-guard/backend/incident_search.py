@@ -0,0 +1,94 @@
+# incident_search.py
+# Incident-level ranking for /search: chunk hits are grouped by jira_id and scored
+# with a configurable aggregation, so one long incident can't fill every top_k slot.
+# Chroma has no offset for queries, so over-fetching grows the window until enough
+# distinct incidents are found.
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OVERFETCH_FACTOR = 3   # chunks fetched per requested incident on the first query
+MAX_FETCH = 1000       # never ask Chroma for more chunks than this
+AGGREGATIONS = ("max", "mean", "top_n_sum")
+
+# (n_results) -> (documents, metadatas, distances) for the n closest chunks
+QueryChunks = Callable[[int], Tuple[List[str], List[Dict], List[float]]]
+
+
+def compile_where(status: Optional[List[str]] = None, error_type: Optional[List[str]] = None,
+                  since: Optional[float] = None, until: Optional[float] = None,
+                  jira_project: Optional[str] = None) -> Optional[Dict]:
+    """Chroma `where` clause for the structured /search filters; None when nothing is filtered."""
+    clauses = []
+    if status:
+        clauses.append({"status": {"$in": list(status)}})
+    if error_type:
+        clauses.append({"error_type": {"$in": list(error_type)}})
+    if since is not None:
+        clauses.append({"timestamp_epoch": {"$gte": since}})
+    if until is not None:
+        clauses.append({"timestamp_epoch": {"$lte": until}})
+    if jira_project:
+        clauses.append({"jira_project": jira_project.rstrip("-")})
+    if not clauses:
+        return None
+    # Chroma wants a bare clause when there is only one
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def incident_score(distances: List[float], threshold: float, aggregation: str = "max", top_n: int = 3) -> float:
+    # Scores are margins below the distance threshold, so higher is better and every hit counts positively
+    margins = sorted((threshold - d for d in distances), reverse=True)
+    if aggregation == "max":
+        return margins[0]
+    if aggregation == "mean":
+        return sum(margins) / len(margins)
+    if aggregation == "top_n_sum":
+        return sum(margins[:top_n])
+    raise ValueError(f"Unknown aggregation: {aggregation}")
+
+
+def collapse(docs: List[str], metas: List[Dict], dists: List[float], threshold: float,
+             aggregation: str = "max", top_n: int = 3) -> List[Dict]:
+    """Group hits under the threshold by jira_id, best incident first; each keeps its best chunk."""
+    groups: Dict[str, Dict] = {}
+    for doc, meta, dist in zip(docs, metas, dists):
+        if dist >= threshold:
+            continue
+        jira_id = meta.get("jira_id")
+        group = groups.get(jira_id)
+        if group is None:
+            # Chroma returns hits closest first, so the first chunk seen is the best snippet
+            groups[jira_id] = {"jira_id": jira_id, "document": doc, "metadata": meta,
+                               "distance": dist, "distances": [dist]}
+        else:
+            group["distances"].append(dist)
+
+    ranked = []
+    for group in groups.values():
+        distances = group.pop("distances")
+        group["matched_chunks"] = len(distances)
+        group["score"] = incident_score(distances, threshold, aggregation, top_n)
+        ranked.append(group)
+    ranked.sort(key=lambda g: g["score"], reverse=True)
+    return ranked
+
+
+def search_incidents_grouped(query_chunks: QueryChunks, total_chunks: int, top_k: int, threshold: float,
+                             aggregation: str = "max", top_n: int = 3) -> Tuple[List[Dict], int]:
+    """Return (top_k incidents, chunks fetched), widening the fetch only while it can still add incidents."""
+    n = min(max(top_k * OVERFETCH_FACTOR, top_k), total_chunks, MAX_FETCH)
+    if n <= 0:
+        return [], 0
+    while True:
+        docs, metas, dists = query_chunks(n)
+        groups = collapse(docs, metas, dists, threshold, aggregation, top_n)
+        exhausted = len(docs) < n or n >= min(total_chunks, MAX_FETCH)
+        # Hits come back closest first: once the farthest one misses the threshold, fetching more can't help
+        past_threshold = bool(dists) and dists[-1] >= threshold
+        if len(groups) >= top_k or exhausted or past_threshold:
+            logger.info(f"Grouped search fetched {len(docs)} chunks -> {len(groups)} incidents")
+            return groups[:top_k], len(docs)
+        n = min(n * 2, total_chunks, MAX_FETCH)
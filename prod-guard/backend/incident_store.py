@@ -0,0 +1,77 @@
+# incident_store.py
+# Incident-level fields live here, once per jira_id, instead of being copied into
+# the Chroma metadata of every chunk. Chunks carry jira_id, chunk_index and the short
+# filter fields (status, error_type, project, epoch timestamp); results are
+# hydrated from this store in one query.
+
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+INCIDENT_STORE_PATH = "db/incidents.sqlite3"
+INCIDENT_FIELDS = [
+    "error_description", "error_type", "status", "resolution_comment",
+    "timestamp", "rca_doc_url", "other_metadata",
+]
+MAX_SQL_VARIABLES = 900  # stay under SQLite's bound-parameter limit
+
+
+class IncidentStore:
+    def __init__(self, path: str = INCIDENT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        columns = ", ".join(f"{field} TEXT" for field in INCIDENT_FIELDS)
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS incidents (
+                jira_id TEXT PRIMARY KEY,
+                {columns},
+                chunk_count INTEGER NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def upsert_many(self, incidents: Iterable[Dict]) -> None:
+        """Store incidents given as {"jira_id", <INCIDENT_FIELDS>..., "chunk_count"}."""
+        rows = [
+            (i["jira_id"], *[i.get(field) for field in INCIDENT_FIELDS], i["chunk_count"])
+            for i in incidents
+        ]
+        placeholders = ", ".join("?" * (len(INCIDENT_FIELDS) + 2))
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO incidents VALUES ({placeholders})", rows)
+
+    def get_many(self, jira_ids: Iterable[str]) -> Dict[str, Dict]:
+        """jira_id -> incident fields for the ids that are known."""
+        ids = list(dict.fromkeys(jira_ids))
+        found: Dict[str, Dict] = {}
+        with self._lock:
+            for start in range(0, len(ids), MAX_SQL_VARIABLES):
+                part = ids[start:start + MAX_SQL_VARIABLES]
+                rows = self._db.execute(
+                    f"SELECT jira_id, {', '.join(INCIDENT_FIELDS)} FROM incidents "
+                    f"WHERE jira_id IN ({', '.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = {"jira_id": row[0], **dict(zip(INCIDENT_FIELDS, row[1:]))}
+        return found
+
+    def chunk_counts(self, jira_ids: Iterable[str]) -> Dict[str, int]:
+        ids = list(dict.fromkeys(jira_ids))
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for start in range(0, len(ids), MAX_SQL_VARIABLES):
+                part = ids[start:start + MAX_SQL_VARIABLES]
+                counts.update(self._db.execute(
+                    f"SELECT jira_id, chunk_count FROM incidents WHERE jira_id IN ({', '.join('?' * len(part))})",
+                    part,
+                ).fetchall())
+        return counts
+
+    def stats(self) -> Dict:
+        with self._lock:
+            incidents, chunks = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM incidents"
+            ).fetchone()
+        return {"incidents": incidents, "chunks": chunks}
@@ -0,0 +1,80 @@
+# json_stream.py
+# The shopping backend and prod-guard are deployed separately and share no package,
+# so each carries this module; keep the copies identical.
+
+import json
+from typing import Any, Dict, IO, Iterator
+
+_decoder = json.JSONDecoder()
+
+
+def _iter_array(f: IO[str], chunk_size: int) -> Iterator[Any]:
+    # Decode one element at a time from a top-level JSON array without loading the whole file
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        if not eof and len(buffer) < chunk_size:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                if eof:
+                    return
+                continue
+            if buffer[0] != "[":
+                raise ValueError("Expected a JSON array")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            continue
+        try:
+            item, end = _decoder.raw_decode(buffer)
+            # A scalar cut at the buffer end (e.g. "12" of "123") still decodes; make sure it's complete
+            complete = eof or end < len(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Element spans the chunk boundary; read more
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_json_stream(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Yield records from a seekable text stream holding a JSON array or JSONL, one at a time."""
+    head = ""
+    while not head:
+        char = f.read(1)
+        if not char:
+            return
+        head = char.strip()
+    f.seek(0)
+    if head == "[":
+        yield from _iter_array(f, chunk_size)
+    else:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_json_records(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Yield records from a JSON array file or a JSONL file, one at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_json_stream(f, chunk_size)
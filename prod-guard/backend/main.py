@@ -1,11 +1,25 @@
+import itertools
 import json
 import os
+import shutil
+import tempfile
+import threading
+import time
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from datetime import datetime
 import chromadb
 import logging
+from embedding_cache import CachedEmbeddings
+from incident_ingest import backfill_filter_metadata, ingest_records, to_epoch
+from incident_store import IncidentStore
+from incident_search import compile_where, search_incidents_grouped
+from json_stream import iter_json_records
+from batch_search import NEAR_DUPLICATE_SIMILARITY, dedupe_exact, dedupe_near, implicated_incidents
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -20,82 +34,147 @@ os.makedirs(persist_directory, exist_ok=True)
 client = chromadb.PersistentClient(path=persist_directory)
 collection = client.get_or_create_collection(name="incident_records")
 
-# Embedding function
-embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Embedding function; query vectors are cached in memory and persisted across restarts
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+embedding_function = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    persist_path="db/query_embeddings.sqlite3"
+)
 
-def sanitize_metadata_value(value):
-    return value if value is not None else "unknown"
+# Incident fields, stored once per jira_id; chunks in Chroma only reference them
+incident_store = IncidentStore("db/incidents.sqlite3")
+
+# Chunks ingested before /search had filters lack the filter fields and would silently
+# drop out of filtered searches; they are backfilled once, in the background, at startup
+FILTER_BACKFILL_MARKER = "db/filter_metadata.backfilled"
+filter_backfill_done = threading.Event()
+
+def backfill_filters():
+    try:
+        if not os.path.exists(FILTER_BACKFILL_MARKER):
+            started = time.perf_counter()
+            updated = backfill_filter_metadata(collection, incident_store)
+            logger.info(f"Backfilled filter metadata on {updated} chunks in {time.perf_counter() - started:.1f}s")
+            open(FILTER_BACKFILL_MARKER, "w").close()
+        filter_backfill_done.set()
+    except Exception as e:
+        logger.error(f"Filter metadata backfill failed, filtered searches may miss older incidents: {e}")
+
+@app.on_event("startup")
+def start_filter_backfill():
+    threading.Thread(target=backfill_filters, name="filter-backfill", daemon=True).start()
 
 @app.post("/upload-json")
-async def upload_json(file: UploadFile = File(...)):
+def upload_json(file: UploadFile = File(...)):
     logger.info(f"Received file: {file.filename}")
-    content = await file.read()
+    # FastAPI closes the upload once this handler returns, but the response streams
+    # after that; copy it to a file the response owns and parse that incrementally
+    with tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False) as spool:
+        shutil.copyfileobj(file.file, spool)
+    records = iter_json_records(spool.name)
+
+    def cleanup():
+        records.close()
+        if os.path.exists(spool.name):
+            os.remove(spool.name)
+
     try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
+        first = next(records, None)
+    except (ValueError, UnicodeDecodeError):
         logger.error("Invalid JSON")
+        cleanup()
         raise HTTPException(status_code=400, detail="Invalid JSON file")
 
-    all_chunks, all_embeddings, metadatas, ids = [], [], [], []
-    skipped = 0
-
-    for i, record in enumerate(data):
-        text = record.get("error_description", "")
-        if not text.strip():
-            skipped += 1
-            continue
-
-        splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-        chunks = splitter.split_text(text)
-        embeddings = [embedding_function.embed_query(c) for c in chunks]
-
-        for idx, (chunk, emb) in enumerate(zip(chunks, embeddings)):
-            all_chunks.append(chunk)
-            all_embeddings.append(emb)
-            metadatas.append({
-                "jira_id": sanitize_metadata_value(record.get("jira_id")),
-                "error_description": sanitize_metadata_value(text),
-                "error_type": sanitize_metadata_value(record.get("error_type")),
-                "status": sanitize_metadata_value(record.get("status")),
-                "resolution_comment": sanitize_metadata_value(record.get("resolution_comment")),
-                "timestamp": sanitize_metadata_value(record.get("timestamp")),
-                "rca_doc_url": sanitize_metadata_value(record.get("rca_doc_url")),
-                "other_metadata": sanitize_metadata_value(record.get("other_metadata")),
-                "chunk_index": idx
-            })
-            ids.append(f"{record.get('jira_id')}_{idx}")
+    # Newline-delimited JSON progress: one event per batch, then a summary
+    def events():
+        try:
+            head = [first] if first is not None else []
+            for event in ingest_records(itertools.chain(head, records), collection, embedding_function, incident_store):
+                yield json.dumps(event) + "\n"
+        except (ValueError, UnicodeDecodeError) as e:
+            logger.error(f"Invalid JSON after partial ingest: {e}")
+            yield json.dumps({"type": "error", "detail": f"Invalid JSON file: {e}"}) + "\n"
+        except Exception as e:
+            logger.error(f"Failed to store in ChromaDB: {e}")
+            yield json.dumps({"type": "error", "detail": "Failed to store data in ChromaDB"}) + "\n"
+        finally:
+            cleanup()
 
-    try:
-        collection.add(
-            documents=all_chunks,
-            embeddings=all_embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
-    except Exception as e:
-        logger.error(f"Failed to store in ChromaDB: {e}")
-        raise HTTPException(status_code=500, detail="Failed to store data in ChromaDB")
+    # The background task also cleans up when the client goes away before streaming starts
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(cleanup))
 
-    return {
-        "message": f"Uploaded and stored {len(all_chunks)} chunks.",
-        "skipped_records": skipped
-    }
+class SearchFilters(BaseModel):
+    # Structured filters, applied inside Chroma before ranking
+    status: Optional[List[str]] = None  # e.g. ["Open", "In Progress"]
+    error_type: Optional[List[str]] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    last_days: Optional[int] = None  # shorthand for since = now - last_days
+    # Exact project key, the part of the jira_id before the first "-": "JIRA" matches JIRA-123,
+    # a trailing "-" is ignored ("JIRA-"), and there is no prefix or case-insensitive match
+    jira_project: Optional[str] = None
 
-class SearchRequest(BaseModel):
+class SearchRequest(SearchFilters):
     query: str
     top_k: int = 5
     threshold: float = 0.97  # default max distance
+    group_by_incident: bool = False  # return top_k distinct incidents instead of top_k chunks
+    aggregation: Literal["max", "mean", "top_n_sum"] = "max"  # how an incident's chunk hits are scored
+    top_n: int = 3  # chunks summed per incident for top_n_sum
+
+class BatchSearchRequest(SearchFilters):
+    queries: List[str]
+    top_k: int = 5
+    threshold: float = 0.97  # default max distance
+    near_duplicate_similarity: float = NEAR_DUPLICATE_SIMILARITY  # queries this close share one search
+    top_incidents: int = 10  # size of the merged ranking
+
+def request_where(req: SearchFilters) -> Optional[Dict]:
+    since = to_epoch(req.since.isoformat()) if req.since else None
+    if req.last_days is not None:
+        window_start = time.time() - req.last_days * 86400
+        since = max(since, window_start) if since is not None else window_start
+    until = to_epoch(req.until.isoformat()) if req.until else None
+    where = compile_where(req.status, req.error_type, since, until, req.jira_project)
+    if where and not filter_backfill_done.is_set():
+        logger.warning("Filter metadata backfill has not finished; older incidents may be missing from filtered results")
+    return where
+
+def incidents_for(metas: List[Dict]) -> Dict[str, Dict]:
+    # Incident fields for all hits in one lookup, returned once per jira_id rather than per hit.
+    # Chunks stored before the incident store existed still carry the full fields themselves.
+    return incident_store.get_many(meta.get("jira_id") for meta in metas)
 
 @app.post("/search")
 def search_incidents(req: SearchRequest):
     logger.info(f"Search request: {req.query}, top_k: {req.top_k}, threshold: {req.threshold}")
     # 1. Embed the query
     query_emb = embedding_function.embed_query(req.query)
+    where = request_where(req)
+    if where:
+        logger.info(f"Search filters: {where}")
+
+    if req.group_by_incident:
+        def query_chunks(n: int):
+            results = collection.query(query_embeddings=[query_emb], n_results=n, where=where,
+                                       include=["documents", "metadatas", "distances"])
+            return results["documents"][0], results["metadatas"][0], results["distances"][0]
+
+        # 2. Over-fetch chunks until top_k distinct incidents clear the threshold
+        groups, fetched = search_incidents_grouped(
+            query_chunks, collection.count(), req.top_k, req.threshold, req.aggregation, req.top_n
+        )
+        if not groups:
+            raise HTTPException(status_code=404, detail="No relevant matches found.")
+        return {"results": groups, "incidents": incidents_for([g["metadata"] for g in groups]),
+                "chunks_fetched": fetched}
 
     # 2. Retrieve top_k similar items
     results = collection.query(
         query_embeddings=[query_emb],
-        n_results=req.top_k
+        n_results=req.top_k,
+        where=where
     )
     logger.info(f"Retrieved {len(results['documents'][0])} results")
 
@@ -120,4 +199,67 @@ def search_incidents(req: SearchRequest):
     if not filtered:
         raise HTTPException(status_code=404, detail="No relevant matches found.")
 
-    return {"results": filtered}
+    return {"results": filtered, "incidents": incidents_for([r["metadata"] for r in filtered])}
+
+MAX_BATCH_QUERIES = 1000
+
+@app.post("/search/batch")
+def search_incidents_batch(req: BatchSearchRequest):
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(req.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    started = time.perf_counter()
+    logger.info(f"Batch search request: {len(req.queries)} queries, top_k: {req.top_k}")
+
+    # 1. Drop exact duplicates (after masking ids, numbers and timestamps), embed the rest in one call
+    distinct, exact_map = dedupe_exact(req.queries)
+    vectors = embedding_function.embed_documents(distinct)
+
+    # 2. Near-duplicates share the search of their representative
+    near_map = dedupe_near(vectors, req.near_duplicate_similarity)
+    searched = sorted(set(near_map))
+    slot = {d: i for i, d in enumerate(searched)}
+
+    # 3. One multi-vector query for everything that is left
+    results = collection.query(
+        query_embeddings=[vectors[d] for d in searched],
+        n_results=req.top_k,
+        where=request_where(req)
+    )
+    hits = [
+        [
+            {"jira_id": meta.get("jira_id"), "chunk_index": meta.get("chunk_index"), "document": doc, "distance": dist}
+            for doc, meta, dist in zip(docs, metas, dists) if dist < req.threshold
+        ]
+        for docs, metas, dists in zip(results["documents"], results["metadatas"], results["distances"])
+    ]
+
+    # 4. Per-query results point at the shared search; incident fields are returned once
+    per_query = []
+    weights = [0] * len(searched)
+    for query, d in zip(req.queries, exact_map):
+        i = slot[near_map[d]]
+        weights[i] += 1
+        per_query.append({"query": query, "searched_as": distinct[searched[i]], "results": hits[i]})
+
+    implicated = implicated_incidents(hits, weights, req.threshold, req.top_incidents)
+    incidents = incident_store.get_many(h["jira_id"] for query_hits in hits for h in query_hits)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Batch search: {len(req.queries)} queries -> {len(distinct)} distinct -> "
+                f"{len(searched)} searched in {elapsed:.2f}s")
+    return {
+        "results": per_query,
+        "implicated_incidents": implicated,
+        "incidents": incidents,
+        "stats": {
+            "queries": len(req.queries),
+            "distinct_queries": len(distinct),
+            "searched_queries": len(searched),
+            "seconds": round(elapsed, 3),
+        },
+    }
+
+@app.get("/stats")
+def stats():
+    return {"embeddings": embedding_function.stats(), "incidents": incident_store.stats()}
@@ -0,0 +1,59 @@
+# tests/test_batch_search.py
+
+import pytest
+
+from batch_search import dedupe_exact, dedupe_near, implicated_incidents, normalize_alert
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Upstream returned HTTP 502", "Upstream returned HTTP 503"),
+    ("ORA-00942: table or view does not exist", "ORA-01017: table or view does not exist"),
+    ("Listener failed to bind on ipv4", "Listener failed to bind on ipv6"),
+    ("I/O error on /dev/sda1", "I/O error on /dev/sdb2"),
+    ("Disk usage at 91% on db-1", "Disk usage at 97% on db-1"),
+])
+def test_codes_and_names_stay_distinct(a, b):
+    assert normalize_alert(a) != normalize_alert(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Request 3f2b8c1e-9a4d-4e6f-8b7a-1c2d3e4f5a6b failed", "Request 0a1b2c3d-4e5f-4a6b-9c8d-7e6f5a4b3c2d failed"),
+    ("Timeout connecting to 10.0.3.17:5432", "Timeout connecting to 10.0.9.4:5432"),
+    ("2024-05-01T12:00:03Z worker crashed", "2024-05-02T08:41:59.120+02:00 worker crashed"),
+    ("[12:00:03] worker crashed", "[23:59:59.5] worker crashed"),
+    ("Segfault at 0x7ffd5e8c", "Segfault at 0x55d0a1b2"),
+    ("Cache miss for key 9f86d081884c7d65", "Cache miss for key 2c26b46b68ffc68f"),
+    ("Job 48213377 exceeded its memory limit", "Job 48213912 exceeded its memory limit"),
+    ("Worker  DIED ", "worker died"),
+])
+def test_volatile_tokens_are_masked(a, b):
+    assert normalize_alert(a) == normalize_alert(b)
+
+
+def test_dedupe_exact_maps_every_query_to_its_first_occurrence():
+    queries = ["HTTP 502 from 10.0.0.1", "HTTP 503 from 10.0.0.1", "HTTP 502 from 10.0.0.2"]
+    distinct, mapping = dedupe_exact(queries)
+    assert distinct == queries[:2]
+    assert mapping == [0, 1, 0]
+
+
+def test_dedupe_near_groups_vectors_above_threshold():
+    vectors = [[1.0, 0.0], [0.0, 1.0], [0.999, 0.01], [0.0, 0.0]]
+    assert dedupe_near(vectors, threshold=0.97) == [0, 1, 0, 3]
+    # A threshold above every similarity keeps all queries
+    assert dedupe_near(vectors, threshold=1.01) == [0, 1, 2, 3]
+
+
+def test_implicated_incidents_counts_each_query_once_with_its_best_chunk():
+    per_query_hits = [
+        [{"jira_id": "A", "distance": 0.2}, {"jira_id": "A", "distance": 0.5}, {"jira_id": "B", "distance": 0.4}],
+        [{"jira_id": "B", "distance": 0.3}],
+    ]
+    ranked = implicated_incidents(per_query_hits, weights=[1, 3], threshold=1.0, limit=10)
+
+    assert [e["jira_id"] for e in ranked] == ["B", "A"]
+    b, a = ranked
+    assert b["queries"] == 4 and b["best_distance"] == 0.3
+    assert b["score"] == pytest.approx(1 * 0.6 + 3 * 0.7)
+    assert a["queries"] == 1 and a["score"] == pytest.approx(0.8)
+    assert implicated_incidents(per_query_hits, [1, 3], 1.0, limit=1) == [b]
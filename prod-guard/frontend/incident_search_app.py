@@ -6,6 +6,7 @@ st.set_page_config(page_title="Incident Search", layout="centered")
 st.title("🔍 Incident Search (RAG UI)")
 
 query = st.text_input("Search for an incident, error or RCA:")
+group_by_incident = st.checkbox("One result per incident", value=True)
 
 if not query:
     st.info("Enter a search term above to begin.")
@@ -13,22 +14,28 @@ else:
     try:
         response = requests.post(
             "http://localhost:8000/search",
-            json={"query": query}
+            json={"query": query, "group_by_incident": group_by_incident}
         )
 
         st.write("🧠 Backend response status:", response.status_code)
 
         if response.status_code == 200:
-            results = response.json()["results"]
+            body = response.json()
+            results = body["results"]
+            # Incident fields come once per jira_id, next to the chunk hits
+            incidents = body.get("incidents", {})
             if not results:
                 st.warning("No matching results found.")
             else:
                 st.success(f"Top {len(results)} similar records found")
 
                 for i, res in enumerate(results):
-                    st.subheader(f"Result {i+1}")
+                    title = f"Result {i+1}"
+                    if "matched_chunks" in res:
+                        title += f": {res['jira_id']} ({res['matched_chunks']} matching chunks)"
+                    st.subheader(title)
                     st.write(res["document"])
-                    st.json(res["metadata"])
+                    st.json({**res["metadata"], **incidents.get(res["metadata"].get("jira_id"), {})})
                     st.markdown("---")
         else:
             st.error(f"Search failed. Status code: {response.status_code}")
@@ -0,0 +1,132 @@
+# answer_cache.py
+# Semantic cache for /ask: a question whose embedding is close enough to one we
+# already answered gets the stored answer and sources back without calling the LLM.
+
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SIMILARITY_THRESHOLD = 0.95   # cosine similarity needed to reuse an answer
+MAX_ENTRIES = 2000
+
+
+class SemanticAnswerCache:
+    def __init__(self, dim: int = 384, max_entries: int = MAX_ENTRIES, threshold: float = SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # Row i of the matrix holds the normalized question vector of slot i
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries: List[Optional[Dict]] = [None] * max_entries
+        self._last_used = np.full(max_entries, -1, dtype=np.int64)  # -1 marks a free slot
+        self._clock = 0
+        self._by_source: Dict[str, set] = {}
+        # Bumped on every invalidation; answers computed before a change to a source they
+        # cite are refused by store(), since that change may have removed their context
+        self._version = 0
+        self._changed_at: Dict[str, int] = {}
+        self._cleared_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.stale_rejected = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def lookup(self, query_vector: List[float]) -> Optional[Dict]:
+        """Return {"question", "answer", "sources", "similarity"} for the closest cached question, if close enough."""
+        v = self._normalize(query_vector)
+        with self._lock:
+            used = self._last_used >= 0
+            if not used.any():
+                self.misses += 1
+                return None
+            similarities = self._vectors @ v
+            similarities[~used] = -1.0
+            slot = int(similarities.argmax())
+            if similarities[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[slot] = self._tick()
+            self.hits += 1
+            return {**self._entries[slot], "similarity": float(similarities[slot])}
+
+    def version(self) -> int:
+        """Token to pass to store() for an answer whose retrieval starts now."""
+        with self._lock:
+            return self._version
+
+    def store(self, query_vector: List[float], question: str, answer: str, sources: List[str],
+              version: Optional[int] = None) -> bool:
+        """Cache an answer; with `version`, refuse it if a cited source changed since then."""
+        with self._lock:
+            if version is not None and (
+                self._cleared_at > version or any(self._changed_at.get(s, 0) > version for s in sources)
+            ):
+                self.stale_rejected += 1
+                return False
+            free = np.flatnonzero(self._last_used < 0)
+            # Evict the least recently used entry when full
+            slot = int(free[0]) if len(free) else int(self._last_used.argmin())
+            self._drop(slot)
+            self._vectors[slot] = self._normalize(query_vector)
+            self._entries[slot] = {"question": question, "answer": answer, "sources": sources}
+            self._last_used[slot] = self._tick()
+            for source in set(sources):
+                self._by_source.setdefault(source, set()).add(slot)
+            return True
+
+    def _drop(self, slot: int) -> None:
+        entry = self._entries[slot]
+        if entry is not None:
+            for source in set(entry["sources"]):
+                slots = self._by_source.get(source)
+                if slots is not None:
+                    slots.discard(slot)
+                    if not slots:
+                        del self._by_source[source]
+        self._entries[slot] = None
+        self._last_used[slot] = -1
+
+    def invalidate_source(self, source: str) -> int:
+        """Drop every cached answer that cited `source`; returns how many were dropped."""
+        with self._lock:
+            self._version += 1
+            self._changed_at[source] = self._version
+            slots = list(self._by_source.get(source, ()))
+            for slot in slots:
+                self._drop(slot)
+            self.invalidated += len(slots)
+            return len(slots)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._cleared_at = self._version
+            self._changed_at.clear()
+            for slot in range(self.max_entries):
+                self._entries[slot] = None
+            self._last_used[:] = -1
+            self._by_source.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": int((self._last_used >= 0).sum()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidated": self.invalidated,
+            "stale_rejected": self.stale_rejected,
+        }
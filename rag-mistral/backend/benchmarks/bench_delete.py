@@ -0,0 +1,128 @@
+# benchmarks/bench_delete.py
+#
+# Removal benchmark on a synthetic 1k-document store (random vectors, so no model
+# is loaded). Compares the old way of dropping content -- rmtree the store and
+# rebuild it, re-adding whatever should survive -- with per-document delete by
+# chunk ID and an in-place collection reset. The rebuild numbers exclude
+# re-embedding, which the old flow also had to pay for every remaining document.
+# Run from backend/:  python -m benchmarks.bench_delete
+
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from chromadb.api.client import SharedSystemClient
+from langchain_community.vectorstores import Chroma
+
+from doc_index import DocumentIndex
+from ingest import IngestJobManager, chunk_ids
+
+DOCUMENTS = 1000
+CHUNKS_PER_DOCUMENT = 20
+DIM = 384
+ADD_BATCH_SIZE = 5000
+DELETES = 20
+
+
+def synthetic_store():
+    docs = {}
+    for d in range(DOCUMENTS):
+        source = f"doc_{d:04d}.pdf"
+        chunks = [(f"{source} chunk {c} " + "lorem ipsum " * 20, {"source": source, "page": c // 4})
+                  for c in range(CHUNKS_PER_DOCUMENT)]
+        vectors = [[random.random() for _ in range(DIM)] for _ in chunks]
+        docs[source] = (chunk_ids(source, chunks), chunks, vectors)
+    return docs
+
+
+def add_documents(vectordb, doc_index, docs) -> None:
+    ids, texts, metas, vecs = [], [], [], []
+    for source, (source_ids, chunks, vectors) in docs.items():
+        ids += source_ids
+        texts += [t for t, _ in chunks]
+        metas += [m for _, m in chunks]
+        vecs += vectors
+        if doc_index is not None:
+            doc_index.replace_source(source, source, [(i, m["page"], None) for i, (_, m) in zip(source_ids, chunks)],
+                                     page_count=CHUNKS_PER_DOCUMENT // 4, byte_size=0)
+    for start in range(0, len(ids), ADD_BATCH_SIZE):
+        end = start + ADD_BATCH_SIZE
+        vectordb._collection.upsert(ids=ids[start:end], documents=texts[start:end],
+                                    metadatas=metas[start:end], embeddings=vecs[start:end])
+
+
+def fresh_store(db_dir: str) -> Chroma:
+    # rmtree + reopen, as the old handlers did; chromadb caches one client per path,
+    # so drop it or the new store writes through the deleted database
+    shutil.rmtree(db_dir)
+    SharedSystemClient.clear_system_cache()
+    return Chroma(persist_directory=db_dir, embedding_function=None)
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_delete_")
+    db_dir = os.path.join(workdir, "db")
+    docs = synthetic_store()
+    print(f"{DOCUMENTS} documents x {CHUNKS_PER_DOCUMENT} chunks")
+
+    # Old: remove one document = rmtree + new client + re-add the other 999
+    vectordb = Chroma(persist_directory=db_dir, embedding_function=None)
+    add_documents(vectordb, None, docs)
+    victim = next(iter(docs))
+    remaining = {s: d for s, d in docs.items() if s != victim}
+
+    def rebuild_without_victim():
+        add_documents(fresh_store(db_dir), None, remaining)
+
+    rebuild_seconds = timed(rebuild_without_victim)
+    print(f"rmtree + rebuild without one document:   {rebuild_seconds * 1000:10.1f} ms")
+
+    # Old /clear: rmtree + new client
+    clear_rebuild_seconds = timed(lambda: fresh_store(db_dir))
+    print(f"rmtree + rebuild (clear):                {clear_rebuild_seconds * 1000:10.1f} ms")
+
+    # New: delete by chunk ID via the document index
+    vectordb = fresh_store(db_dir)
+    doc_index = DocumentIndex(os.path.join(workdir, "doc_index.sqlite3"))
+    add_documents(vectordb, doc_index, docs)
+    manager = IngestJobManager(
+        store_chunks=lambda *args: None,
+        update_metadata=lambda ids, metas: None,
+        delete_chunks=lambda ids: vectordb._collection.delete(ids=ids),
+        purge_source=lambda source: vectordb._collection.delete(where={"source": source}),
+        doc_index=doc_index,
+    )
+    victims = random.sample(sorted(docs), DELETES)
+    per_delete = [timed(lambda s=s: manager.delete_source(s)) for s in victims]
+    expected = (DOCUMENTS - DELETES) * CHUNKS_PER_DOCUMENT
+    assert vectordb._collection.count() == expected, vectordb._collection.count()
+    per_delete.sort()
+    print(f"delete one document by ID (median/max):  {per_delete[len(per_delete) // 2] * 1000:10.1f} ms"
+          f" / {per_delete[-1] * 1000:.1f} ms")
+
+    # New /clear: drop and recreate the collection in place
+    def reset_in_place():
+        name, metadata = vectordb._collection.name, vectordb._collection.metadata
+        vectordb._client.delete_collection(name)
+        vectordb._collection = vectordb._client.get_or_create_collection(
+            name=name, metadata=metadata, embedding_function=None)
+        doc_index.clear()
+
+    reset_seconds = timed(reset_in_place)
+    assert vectordb._collection.count() == 0
+    print(f"in-place reset (clear):                  {reset_seconds * 1000:10.1f} ms")
+
+    manager.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
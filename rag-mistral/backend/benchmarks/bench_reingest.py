@@ -0,0 +1,104 @@
+# benchmarks/bench_reingest.py
+#
+# Repeated-ingest benchmark for content-addressed ingestion. Each PDF in docs/ is
+# ingested three times: fresh, unchanged, and edited (last page dropped). The old
+# append-only path re-embedded every chunk on each upload and kept the duplicates.
+# Run from backend/:  python -m benchmarks.bench_reingest [--random-vectors]
+# --random-vectors swaps the model for langchain's FakeEmbeddings in the workers, so
+# the chunk counts and store sizes are exact but the seconds exclude embedding time.
+
+import argparse
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import Chroma
+from pypdf import PdfReader, PdfWriter
+
+import ingest
+from doc_index import DocumentIndex
+from ingest import INGEST_PROCESSES, IngestJobManager
+
+DOCS_GLOB = "docs/*.pdf"
+
+
+def drop_last_page(src: str, dst: str) -> None:
+    reader = PdfReader(src)
+    writer = PdfWriter()
+    for page in reader.pages[:-1] or reader.pages:
+        writer.add_page(page)
+    with open(dst, "wb") as f:
+        writer.write(f)
+
+
+def _init_random_worker() -> None:
+    ingest._worker_embeddings = FakeEmbeddings(size=384)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--random-vectors", action="store_true", help="don't load the embedding model")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_reingest_")
+    if args.random_vectors:
+        embedding_function = FakeEmbeddings(size=384)
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embedding_function = HuggingFaceEmbeddings(model_name=ingest.EMBEDDING_MODEL)
+    vectordb = Chroma(persist_directory=os.path.join(workdir, "db"), embedding_function=embedding_function)
+    doc_index = DocumentIndex(os.path.join(workdir, "doc_index.sqlite3"))
+    manager = IngestJobManager(
+        store_chunks=lambda ids, texts, metas, vecs: vectordb._collection.upsert(
+            ids=ids, documents=texts, metadatas=metas, embeddings=vecs),
+        update_metadata=lambda ids, metas: vectordb._collection.update(ids=ids, metadatas=metas),
+        delete_chunks=lambda ids: vectordb.delete(ids=ids),
+        purge_source=lambda source: vectordb._collection.delete(where={"source": source}),
+        doc_index=doc_index,
+    )
+    if args.random_vectors:
+        manager._processes.shutdown()
+        manager._processes = ProcessPoolExecutor(max_workers=INGEST_PROCESSES,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_random_worker)
+
+    sources = sorted(glob.glob(DOCS_GLOB))
+    edited_dir = os.path.join(workdir, "edited")
+    os.makedirs(edited_dir)
+    edited = {}
+    for path in sources:
+        edited[path] = os.path.join(edited_dir, os.path.basename(path))
+        drop_last_page(path, edited[path])
+
+    legacy_total = 0
+    chunk_counts = {}
+    rounds = [("fresh", {p: p for p in sources}), ("unchanged", {p: p for p in sources}), ("edited", edited)]
+    print(f"{'round':<10} {'embedded':>9} {'reused':>7} {'moved':>6} {'deleted':>8} {'seconds':>8} {'store size':>11} {'legacy size':>12}")
+    for name, files in rounds:
+        started = time.perf_counter()
+        jobs = [manager.submit(os.path.basename(src), path) for src, path in files.items()]
+        while any(job.finished_at is None for job in jobs):
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - started
+        failed = [job.error for job in jobs if job.status == "failed"]
+        if failed:
+            raise RuntimeError(failed)
+        # The old handler parsed and appended every chunk of every upload
+        for job in jobs:
+            if job.status != "unchanged":
+                chunk_counts[job.source] = job.chunks_total
+            legacy_total += chunk_counts[job.source]
+        print(f"{name:<10} {sum(j.chunks_embedded for j in jobs):>9} {sum(j.chunks_reused for j in jobs):>7} "
+              f"{sum(j.chunks_moved for j in jobs):>6} {sum(j.chunks_deleted for j in jobs):>8} {elapsed:>8.2f} {vectordb._collection.count():>11} {legacy_total:>12}")
+
+    manager.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# context_packer.py
+# Builds the /ask prompt context from retrieved chunks: merges overlapping chunks
+# of the same page, drops near-duplicates, orders by relevance and stops at a
+# token budget so prompt size (and Ollama prefill time) stays bounded.
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+CONTEXT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4            # rough estimate for English text with Mistral's tokenizer
+NEAR_DUPLICATE_OVERLAP = 0.85  # share of a segment's word trigrams already in the context
+MIN_TEXT_OVERLAP = 20          # shortest suffix/prefix match treated as splitter overlap
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _text_overlap(left: str, right: str) -> int:
+    # Length of the longest suffix of `left` that is a prefix of `right`
+    for k in range(min(len(left), len(right)), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def _join(left: Dict, right: Dict) -> Optional[str]:
+    a, b = left["text"], right["text"]
+    if b in a:
+        return a
+    if a in b:
+        return b
+    start_a, start_b = left.get("start"), right.get("start")
+    # Offsets can be stale after the page was edited; splice on them only if the texts agree
+    if start_a is not None and start_b is not None and start_a <= start_b <= start_a + len(a) \
+            and b.startswith(a[start_b - start_a:]):
+        return a + b[start_a + len(a) - start_b:]
+    overlap = _text_overlap(a, b)
+    return a + b[overlap:] if overlap else None
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def merge_chunks(results: List[Tuple[object, float]]) -> List[Dict]:
+    """Merge overlapping chunks from the same source and page into segments."""
+    groups: Dict[Tuple, List[Dict]] = {}
+    for doc, score in results:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append({
+            "text": doc.page_content,
+            "start": doc.metadata.get("start_index"),
+            "score": score,
+            "source": key[0] or "Unknown",
+        })
+
+    segments = []
+    for chunks in groups.values():
+        chunks.sort(key=lambda c: (c["start"] is None, c["start"] or 0))
+        merged: List[Dict] = []
+        for chunk in chunks:
+            for segment in merged:
+                text = _join(segment, chunk) or _join(chunk, segment)
+                if text is not None:
+                    starts = [s for s in (segment["start"], chunk["start"]) if s is not None]
+                    segment["start"] = min(starts) if starts else None
+                    segment["text"] = text
+                    segment["score"] = min(segment["score"], chunk["score"])
+                    break
+            else:
+                merged.append(dict(chunk))
+        segments.extend(merged)
+    return segments
+
+
+def pack_context(results: List[Tuple[object, float]], token_budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, List[str], Dict]:
+    """Return (context, sources used, stats) for the relevant (doc, distance) pairs."""
+    naive_tokens = estimate_tokens("\n\n".join(doc.page_content for doc, _ in results))
+
+    # Most relevant (lowest distance) first
+    segments = sorted(merge_chunks(results), key=lambda s: s["score"])
+
+    kept: List[Dict] = []
+    kept_shingles: List[set] = []
+    used_tokens = 0
+    dropped_duplicates = 0
+    for segment in segments:
+        shingles = _shingles(segment["text"])
+        # Covered by an already kept segment (e.g. the same paragraph in another file)
+        if any(len(shingles & other) / len(shingles) >= NEAR_DUPLICATE_OVERLAP for other in kept_shingles):
+            dropped_duplicates += 1
+            continue
+        tokens = estimate_tokens(segment["text"])
+        if used_tokens + tokens > token_budget:
+            if kept:
+                continue  # a smaller, less relevant segment may still fit
+            # Never send an empty context: trim the single best segment to the budget
+            segment = dict(segment, text=segment["text"][:token_budget * CHARS_PER_TOKEN])
+            tokens = estimate_tokens(segment["text"])
+        kept.append(segment)
+        kept_shingles.append(shingles)
+        used_tokens += tokens
+
+    context = "\n\n".join(s["text"] for s in kept)
+    packed_tokens = estimate_tokens(context)
+    stats = {
+        "chunks_in": len(results),
+        "segments_out": len(kept),
+        "near_duplicates_dropped": dropped_duplicates,
+        "tokens_naive": naive_tokens,
+        "tokens_packed": packed_tokens,
+        "tokens_saved": max(0, naive_tokens - packed_tokens),
+    }
+    return context, [s["source"] for s in kept], stats
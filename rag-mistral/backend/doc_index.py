@@ -0,0 +1,122 @@
+# doc_index.py
+# Small SQLite sidecar next to Chroma: which chunks belong to which source file,
+# plus per-source aggregates. Lets re-uploads, deletes and listings avoid scanning
+# the vector store.
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DOC_INDEX_PATH = "doc_index.sqlite3"
+# file_hash of sources backfilled from the vector store: never matches a real upload,
+# so re-uploading one re-ingests it and deletes its old chunks by ID
+LEGACY_FILE_HASH = "legacy"
+
+
+class DocumentIndex:
+    def __init__(self, path: str = DOC_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                byte_size INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                page INTEGER,
+                position INTEGER NOT NULL,
+                start_index INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks (source, position);
+        """)
+        # Indexes created before start_index was tracked
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+        if "start_index" not in columns:
+            self._db.execute("ALTER TABLE chunks ADD COLUMN start_index INTEGER")
+        self._db.commit()
+
+    def file_hash(self, source: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT file_hash FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def chunk_ids(self, source: str) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,)).fetchall()
+        return {r[0] for r in rows}
+
+    def chunk_starts(self, source: str) -> Dict[str, Optional[int]]:
+        """chunk_id -> start_index recorded for each chunk of `source`."""
+        with self._lock:
+            rows = self._db.execute("SELECT chunk_id, start_index FROM chunks WHERE source = ?", (source,)).fetchall()
+        return dict(rows)
+
+    def replace_source(self, source: str, file_hash: str,
+                       chunks: Iterable[Tuple[str, Optional[int], Optional[int]]],
+                       page_count: int, byte_size: int) -> None:
+        """Record the full chunk list for `source`; chunks are (chunk_id, page, start_index) in document order."""
+        rows = [
+            (chunk_id, source, page, position, start_index)
+            for position, (chunk_id, page, start_index) in enumerate(chunks)
+        ]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._db.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)",
+                (source, file_hash, len(rows), page_count, byte_size, time.time()),
+            )
+
+    def remove_source(self, source: str) -> List[str]:
+        """Forget `source` and return the chunk IDs that belonged to it."""
+        with self._lock, self._db:
+            ids = [r[0] for r in self._db.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,))]
+            self._db.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._db.execute("DELETE FROM sources WHERE source = ?", (source,))
+        return ids
+
+    def list_sources(self, after: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """One row per source, ordered by name, starting after the `after` cursor."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, chunk_count, page_count, byte_size, ingested_at FROM sources "
+                "WHERE source > ? ORDER BY source LIMIT ?",
+                (after or "", limit),
+            ).fetchall()
+        return [
+            {"source": r[0], "chunk_count": r[1], "page_count": r[2], "byte_size": r[3], "ingested_at": r[4]}
+            for r in rows
+        ]
+
+    def list_chunks(self, source: str, after: int = -1, limit: int = 50) -> List[Dict]:
+        """Chunks of `source` in document order, starting after position `after`."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chunk_id, page, position FROM chunks WHERE source = ? AND position > ? "
+                "ORDER BY position LIMIT ?",
+                (source, after, limit),
+            ).fetchall()
+        return [{"chunk_id": r[0], "page": r[1], "position": r[2]} for r in rows]
+
+    def has_source(self, source: str) -> bool:
+        return self.file_hash(source) is not None
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM sources")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sources, chunks = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM sources"
+            ).fetchone()
+        return {"sources": sources, "chunks": chunks}
@@ -0,0 +1,292 @@
+# ingest.py
+# Background PDF ingestion: parsing and embedding run in worker processes so the
+# FastAPI event loop stays free for /ask while large uploads are processed.
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from doc_index import DocumentIndex
+from rwlock import ReadWriteLock
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+EMBED_BATCH_SIZE = 64
+INGEST_PROCESSES = 2      # worker processes for PDF parsing and embedding
+MAX_PARALLEL_JOBS = 2     # files ingested at the same time
+MAX_FINISHED_JOBS = 500   # finished jobs kept around for /jobs/{id}
+DELETE_BATCH_SIZE = 5000  # chunk IDs per vector store delete or metadata update call
+
+# Callbacks into the vector store: write one embedded batch (ids, texts, metadatas, vectors),
+# rewrite the metadata of stored chunks, delete chunks by ID, and delete chunks of a source
+# that predates the document index
+StoreChunks = Callable[[List[str], List[str], List[Dict], List[List[float]]], None]
+UpdateMetadata = Callable[[List[str], List[Dict]], None]
+DeleteChunks = Callable[[List[str]], None]
+PurgeSource = Callable[[str], None]
+
+
+# === Worker process side ===
+_worker_embeddings = None
+
+
+def _init_worker() -> None:
+    global _worker_embeddings
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def parse_and_split(path: str, source: str) -> Tuple[int, List[Tuple[str, Dict]]]:
+    documents = PyPDFLoader(path).load()
+    # start_index lets the context packer stitch overlapping neighbours back together
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    chunks = splitter.split_documents(documents)
+    # Attach filename into metadata
+    return len(documents), [(c.page_content, {**c.metadata, "source": source}) for c in chunks]
+
+
+def embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+# === Content addressing ===
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source: str, chunks: List[Tuple[str, Dict]]) -> List[str]:
+    # Same text on the same page of the same file -> same ID, so unchanged chunks are reused.
+    # The occurrence counter keeps repeated boilerplate chunks distinct.
+    seen: Dict[str, int] = {}
+    ids = []
+    for text, metadata in chunks:
+        key = f"{source}\0{metadata.get('page')}\0{text}"
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        ids.append(hashlib.sha1(f"{key}\0{occurrence}".encode("utf-8")).hexdigest())
+    return ids
+
+
+# === Job tracking (API process) ===
+class IngestCancelled(Exception):
+    pass
+
+
+class IngestJob:
+    def __init__(self, source: str, path: str, generation: int = 0):
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.path = path
+        self.generation = generation  # store generation the job was queued for
+        self.status = "queued"
+        self.pages_parsed = 0
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+        self.chunks_moved = 0
+        self.chunks_deleted = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "source": self.source,
+            "status": self.status,
+            "pages_parsed": self.pages_parsed,
+            "chunks_total": self.chunks_total,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_reused": self.chunks_reused,
+            "chunks_moved": self.chunks_moved,
+            "chunks_deleted": self.chunks_deleted,
+            "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+            "docs_per_second": round(self.chunks_embedded / elapsed, 1) if elapsed else None,
+            "error": self.error,
+        }
+
+
+class IngestJobManager:
+    def __init__(self, store_chunks: StoreChunks, update_metadata: UpdateMetadata, delete_chunks: DeleteChunks,
+                 purge_source: PurgeSource, doc_index: DocumentIndex, persist: Optional[Callable[[], None]] = None,
+                 store_lock: Optional[ReadWriteLock] = None,
+                 processes: int = INGEST_PROCESSES, max_parallel_jobs: int = MAX_PARALLEL_JOBS):
+        self.store_chunks = store_chunks
+        self.update_metadata = update_metadata
+        self.delete_chunks = delete_chunks
+        self.purge_source = purge_source
+        self.doc_index = doc_index
+        self.persist = persist
+        # Writes hold the lock shared; a full reset takes it exclusively
+        self.store_lock = store_lock or ReadWriteLock()
+        # Bumped by cancel_all(); jobs from an older generation stop before their next write
+        self.generation = 0
+        # Called with the source name whenever its chunks change (e.g. to drop cached answers)
+        self.on_source_changed: List[Callable[[str], None]] = []
+        # spawn, not fork: the API process already has torch and its threads loaded
+        self._processes = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self._jobs_executor = ThreadPoolExecutor(max_workers=max_parallel_jobs, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+        self._source_locks: Dict[str, threading.Lock] = {}
+        self.jobs: Dict[str, IngestJob] = {}
+
+    def submit(self, source: str, path: str) -> IngestJob:
+        with self._lock:
+            job = IngestJob(source, path, self.generation)
+            self.jobs[job.id] = job
+            self._trim()
+        self._jobs_executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    def _trim(self) -> None:
+        finished = [j for j in self.jobs.values() if j.finished_at is not None]
+        for job in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def _source_lock(self, source: str) -> threading.Lock:
+        with self._lock:
+            return self._source_locks.setdefault(source, threading.Lock())
+
+    def cancel_all(self) -> None:
+        """Stop every queued and running job before it writes anything else (call under store_lock.exclusive())."""
+        with self._lock:
+            self.generation += 1
+
+    @contextmanager
+    def _writing(self, job: IngestJob):
+        with self.store_lock.shared():
+            if job.generation != self.generation:
+                raise IngestCancelled()
+            yield
+
+    def delete_source(self, source: str) -> int:
+        """Remove every chunk of `source`; returns how many were deleted."""
+        # Waits for a running ingestion of the same file instead of racing its chunk diff
+        with self._source_lock(source), self.store_lock.shared():
+            ids = self.doc_index.remove_source(source)
+            if ids:
+                for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                    self.delete_chunks(ids[start:start + DELETE_BATCH_SIZE])
+            else:
+                # Uploaded before the document index existed
+                self.purge_source(source)
+            if self.persist:
+                self.persist()
+        for callback in self.on_source_changed:
+            callback(source)
+        return len(ids)
+
+    def _run(self, job: IngestJob) -> None:
+        # Two uploads of the same file name must not interleave their chunk diffs
+        with self._source_lock(job.source):
+            self._ingest(job)
+
+    def _ingest(self, job: IngestJob) -> None:
+        job.started_at = time.time()
+        try:
+            if job.generation != self.generation:
+                raise IngestCancelled()
+            file_hash = file_sha256(job.path)
+            known_hash = self.doc_index.file_hash(job.source)
+            if known_hash == file_hash:
+                job.status = "unchanged"
+                logger.info(f"{job.source} is unchanged, skipping ingestion")
+                return
+            if known_hash is None:
+                # Chunks from before the document index existed carry random IDs
+                with self._writing(job):
+                    self.purge_source(job.source)
+
+            job.status = "parsing"
+            pages, chunks = self._processes.submit(parse_and_split, job.path, job.source).result()
+            job.pages_parsed = pages
+            job.chunks_total = len(chunks)
+
+            ids = chunk_ids(job.source, chunks)
+            starts = self.doc_index.chunk_starts(job.source)
+            existing: Set[str] = set(starts)
+            new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+            job.chunks_reused = len(ids) - len(new)
+            # Reused chunks keep their vector, but text earlier on the page may have changed
+            # length, so their stored start_index (used to stitch neighbours) must follow
+            moved = [i for i, chunk_id in enumerate(ids)
+                     if chunk_id in existing and starts[chunk_id] != chunks[i][1].get("start_index")]
+
+            job.status = "embedding"
+            # All batches are queued at once so every worker process stays busy
+            batches = []
+            for start in range(0, len(new), EMBED_BATCH_SIZE):
+                positions = new[start:start + EMBED_BATCH_SIZE]
+                texts = [chunks[i][0] for i in positions]
+                batches.append((positions, texts, self._processes.submit(embed_batch, texts)))
+            for positions, texts, future in batches:
+                embeddings = future.result()
+                with self._writing(job):
+                    self.store_chunks([ids[i] for i in positions], texts, [chunks[i][1] for i in positions], embeddings)
+                job.chunks_embedded += len(positions)
+
+            with self._writing(job):
+                for start in range(0, len(moved), DELETE_BATCH_SIZE):
+                    positions = moved[start:start + DELETE_BATCH_SIZE]
+                    self.update_metadata([ids[i] for i in positions], [chunks[i][1] for i in positions])
+                job.chunks_moved = len(moved)
+
+            stale = list(existing - set(ids))
+            with self._writing(job):
+                for start in range(0, len(stale), DELETE_BATCH_SIZE):
+                    self.delete_chunks(stale[start:start + DELETE_BATCH_SIZE])
+                job.chunks_deleted = len(stale)
+
+                self.doc_index.replace_source(
+                    job.source, file_hash,
+                    [(chunk_id, metadata.get("page"), metadata.get("start_index"))
+                     for chunk_id, (_, metadata) in zip(ids, chunks)],
+                    page_count=pages, byte_size=os.path.getsize(job.path),
+                )
+                if self.persist:
+                    self.persist()
+            for callback in self.on_source_changed:
+                callback(job.source)
+            job.status = "done"
+            logger.info(f"Ingested {job.source}: {job.to_dict()}")
+        except IngestCancelled:
+            logger.info(f"Ingestion of {job.source} cancelled by a reset")
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception(f"Ingestion of {job.source} failed")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def shutdown(self) -> None:
+        self._jobs_executor.shutdown(wait=False, cancel_futures=True)
+        self._processes.shutdown(wait=False, cancel_futures=True)
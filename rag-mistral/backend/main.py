@@ -1,16 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.chains import RetrievalQA
 from langchain_ollama import OllamaLLM
 from prompts import SYSTEM_PROMPT
-import requests
+from embedding_cache import CachedEmbeddings
+from ingest import IngestJobManager
+from doc_index import LEGACY_FILE_HASH, DocumentIndex
+from answer_cache import SemanticAnswerCache
+from context_packer import pack_context
+from rwlock import ReadWriteLock
+from web_search import SerpApiBackend, WebSearchClient
+from typing import Dict, List, Optional
+import asyncio
+import json
 import os
 import shutil
 import logging
+import time
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -24,7 +33,13 @@ os.makedirs("db", exist_ok=True)
 
 # Initialize core components
 logger.info("Initializing embeddings and vector store...")
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Query vectors are cached in memory and persisted next to the vector store
+embeddings = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+    model_name=EMBEDDING_MODEL,
+    persist_path="query_embeddings.sqlite3"
+)
 
 if os.path.exists("db/chroma.sqlite3"):
     logger.info("Loading existing Chroma vectorstore...")
@@ -41,142 +56,347 @@ retriever = vectordb.as_retriever(
 llm = OllamaLLM(model="mistral")
 qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, return_source_documents=True)
 
-# Configuration for web search (SerpAPI in this example)
+# Configuration for web search (SerpAPI in this example); point WEB_SEARCH_URL at
+# mock_search_server.py to run without SerpAPI
 SERP_API_KEY = "XXXXX"
-SEARCH_ENGINE_URL = "https://serpapi.com/search"
-
-# Helper
-def process_and_add_documents(documents, filename):
-    logger.info("Splitting and embedding documents...")
-    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-    chunks = splitter.split_documents(documents)
-
-    # Attach filename into metadata
-    for chunk in chunks:
-        chunk.metadata["source"] = filename
-
-    logger.info(f"Adding {len(chunks)} chunks from {filename} to vectorstore...")
-    vectordb.add_documents(chunks)
-
+SEARCH_ENGINE_URL = os.getenv("WEB_SEARCH_URL", "https://serpapi.com/search")
+# Start the web search alongside the vector search so a fallback adds no serial latency
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "0") == "1"
+web_search = WebSearchClient(SerpApiBackend(SERP_API_KEY, SEARCH_ENGINE_URL))
+
+# Source file -> chunk IDs, so re-uploads only touch changed chunks
+doc_index = DocumentIndex()
+# Queries and ingestion share the collection; /clear resets it exclusively
+store_lock = ReadWriteLock()
+
+# Helpers for the background ingestion workers
+def store_chunks(ids: List[str], texts: List[str], metadatas: List[Dict], vectors: List[List[float]]):
+    # Embeddings were computed by the ingest workers; write them as-is
+    vectordb._collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=vectors)
+
+def update_metadata(ids: List[str], metadatas: List[Dict]):
+    vectordb._collection.update(ids=ids, metadatas=metadatas)
+
+def delete_chunks(ids: List[str]):
+    vectordb.delete(ids=ids)
+
+def purge_source(source: str):
+    vectordb._collection.delete(where={"source": source})
+
+def reset_vectordb():
+    # Drop and recreate the collection in place; vectordb, retriever and qa keep working
+    name, metadata = vectordb._collection.name, vectordb._collection.metadata
+    vectordb._client.delete_collection(name)
+    vectordb._collection = vectordb._client.get_or_create_collection(
+        name=name, metadata=metadata, embedding_function=None
+    )
+
+def search_vectordb(query_vector: List[float], k: int):
+    with store_lock.shared():
+        return vectordb.similarity_search_by_vector_with_relevance_scores(query_vector, k=k)
+
+def persist_vectordb():
     logger.info("Persisting database...")
     vectordb.persist()
-    logger.info("Done.")
-
-# Helper function to perform web search using SerpAPI
-def search_web(query: str):
-    """
-    Search the web using SerpAPI and return the most relevant results.
-    """
-    params = {
-        "q": query,
-        "api_key": SERP_API_KEY,
-        "engine": "google"  # You can change to other engines like "bing"
-    }
 
-    response = requests.get(SEARCH_ENGINE_URL, params=params)
-    search_results = []
-
-    if response.status_code == 200:
-        data = response.json()
-        for result in data.get("organic_results", []):
-            search_results.append(result.get("snippet", "No snippet available"))
-    return search_results        
+ingest_jobs = IngestJobManager(
+    store_chunks=store_chunks,
+    update_metadata=update_metadata,
+    delete_chunks=delete_chunks,
+    purge_source=purge_source,
+    doc_index=doc_index,
+    persist=persist_vectordb,
+    store_lock=store_lock
+)
 
+# Answers to (near-)identical questions, dropped when a cited document changes
+answer_cache = SemanticAnswerCache()
+ingest_jobs.on_source_changed.append(answer_cache.invalidate_source)
+
+BACKFILL_PAGE_SIZE = 5000
+
+def backfill_doc_index() -> int:
+    """Index sources that were ingested before the document index existed; returns how many."""
+    if doc_index.stats()["sources"] or not vectordb._collection.count():
+        return 0
+    chunks_by_source: Dict[str, List] = {}
+    offset = 0
+    while True:
+        page = vectordb._collection.get(include=["metadatas"], limit=BACKFILL_PAGE_SIZE, offset=offset)
+        for chunk_id, meta in zip(page["ids"], page["metadatas"]):
+            meta = meta or {}
+            chunks_by_source.setdefault(meta.get("source", "Unknown"), []).append(
+                (meta.get("page") or 0, meta.get("start_index") or 0, chunk_id, meta.get("page"),
+                 meta.get("start_index")))
+        if len(page["ids"]) < BACKFILL_PAGE_SIZE:
+            break
+        offset += BACKFILL_PAGE_SIZE
+
+    for source, chunks in chunks_by_source.items():
+        chunks.sort(key=lambda c: (c[0], c[1]))
+        pages = {c[3] for c in chunks if c[3] is not None}
+        path = f"docs/{os.path.basename(source)}"
+        doc_index.replace_source(
+            source, LEGACY_FILE_HASH, [(c[2], c[3], c[4]) for c in chunks],
+            page_count=len(pages), byte_size=os.path.getsize(path) if os.path.exists(path) else 0,
+        )
+    return len(chunks_by_source)
+
+@app.on_event("startup")
+async def index_legacy_documents():
+    # Listings, deletes and re-uploads all go through the document index
+    started = time.perf_counter()
+    backfilled = await asyncio.to_thread(backfill_doc_index)
+    if backfilled:
+        logger.info(f"Backfilled the document index with {backfilled} sources in {elapsed_ms(started)} ms")
+
+@app.on_event("shutdown")
+def stop_ingest_workers():
+    ingest_jobs.shutdown()
+
+def save_upload(file: UploadFile) -> str:
+    path = f"docs/{os.path.basename(file.filename)}"
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+    return path
 
 @app.post("/upload")
-async def upload_pdf(file: UploadFile = File(...)):
-    logger.info(f"Received upload: {file.filename}")
-    temp_path = f"docs/{file.filename}"
-
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
-
-    loader = PyPDFLoader(temp_path)
-    documents = loader.load()
-
-    process_and_add_documents(documents, filename=file.filename)
-
-    return {"message": f"Uploaded and processed {file.filename}"}
-
-@app.post("/ask")
-async def ask_question(query: str = Form(...)):
-    if qa is None:
-        logger.error("QA system not ready!")
-        return {"error": "QA system not ready. Please upload documents first."}
-
-    logger.info(f"Query received: {query}")
+async def upload_pdf(files: List[UploadFile] = File(None), file: Optional[UploadFile] = File(None)):
+    # Accepts several PDFs under "files" (or a single one under "file"); each becomes a background job
+    uploads = list(files or []) + ([file] if file else [])
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    jobs = []
+    for upload in uploads:
+        logger.info(f"Received upload: {upload.filename}")
+        path = await asyncio.to_thread(save_upload, upload)
+        jobs.append(ingest_jobs.submit(os.path.basename(upload.filename), path).to_dict())
+
+    names = ", ".join(job["source"] for job in jobs)
+    return {"message": f"Queued {names} for processing", "jobs": jobs}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+# Retrieval settings for /ask
+RELEVANCE_THRESHOLD = 0.9   # Chroma distance; lower is closer
+SEARCH_K = 8
+
+def elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+async def prepare_answer(query: str, timings: Dict[str, float]) -> Dict:
+    """Everything /ask does before the LLM call; per-stage durations are written into `timings`."""
+    # Taken before retrieval: a delete or /clear from here on makes the answer uncacheable
+    cache_version = answer_cache.version()
+    # Step 0: reuse the answer to a near-identical earlier question
+    started = time.perf_counter()
+    query_vector = await asyncio.to_thread(embeddings.embed_query, query)
+    timings["embed_ms"] = elapsed_ms(started)
+    cached = answer_cache.lookup(query_vector)
+    if cached is not None:
+        logger.info(f"Semantic cache hit (similarity={cached['similarity']:.3f}): {cached['question']}")
+        return {"query_vector": query_vector, "cache_version": cache_version, "cached": cached,
+                "sources": cached["sources"], "scores": [],
+                "context_stats": None, "used_web_search": False, "prompt": None}
 
     # Step 1: semantic search *with* scores
-    raw_results = vectordb.similarity_search_with_score(query, k=8)
+    started = time.perf_counter()
+    speculative = asyncio.ensure_future(web_search.search(query)) if SPECULATIVE_WEB_SEARCH else None
+    raw_results = await asyncio.to_thread(search_vectordb, query_vector, SEARCH_K)
+    timings["search_ms"] = elapsed_ms(started)
     # filter by threshold
-    THRESHOLD = 0.9
-    relevant_docs = [doc for doc, score in raw_results if score < THRESHOLD]
+    relevant_results = [(doc, score) for doc, score in raw_results if score < RELEVANCE_THRESHOLD]
 
     # debug log
     for doc, score in raw_results:
         logger.info(f"{doc.metadata['source']} (score={score:.3f}) → {doc.page_content[:80]}")
 
     used_web_search = False 
-    
+    context_stats = None
+
     # Step 2: build context or fallback
-    if relevant_docs:
-        context = "\n\n".join(d.page_content for d in relevant_docs)
+    if relevant_results:
+        # Merge overlapping chunks, drop near-duplicates and cap the prompt size
+        context, sources, context_stats = pack_context(relevant_results)
+        logger.info(f"Context packed: {context_stats}")
+        if speculative is not None:
+            speculative.cancel()  # not needed; the result still lands in the web search cache
     else:
         logger.info("No relevant PDF context—searching the web")
-        search_results = search_web(query)
+        started = time.perf_counter()
+        # With speculation on this only waits for whatever is left of the request
+        search_results = await (speculative or web_search.search(query))
+        timings["web_search_ms"] = elapsed_ms(started)
         context = "\n\n".join(search_results)
+        sources = ["Web"]
         used_web_search = True
 
-
     # Step 3: Format the prompt with the combined context (from PDFs + Web search if needed)
-    prompt = SYSTEM_PROMPT.format(context=context, question=query)
+    return {
+        "query_vector": query_vector,
+        "cache_version": cache_version,
+        "cached": None,
+        "sources": sources,
+        "scores": [
+            {"source": doc.metadata.get("source", "Unknown"), "page": doc.metadata.get("page"), "score": round(score, 4)}
+            for doc, score in relevant_results
+        ],
+        "context_stats": context_stats,
+        "used_web_search": used_web_search,
+        "prompt": SYSTEM_PROMPT.format(context=context, question=query),
+    }
+
+def remember_answer(plan: Dict, query: str, answer: str) -> None:
+    # Web answers go stale; only document-grounded answers are cached. An empty answer
+    # (the LLM stream ended without tokens) would be replayed to every similar question.
+    if not plan["used_web_search"] and answer.strip():
+        answer_cache.store(plan["query_vector"], query, answer, plan["sources"], version=plan["cache_version"])
+
+def sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ask")
+async def ask_question(query: str = Form(...)):
+    if qa is None:
+        logger.error("QA system not ready!")
+        return {"error": "QA system not ready. Please upload documents first."}
+
+    logger.info(f"Query received: {query}")
+    plan = await prepare_answer(query, {})
+    if plan["cached"] is not None:
+        return {"answer": plan["cached"]["answer"], "sources": plan["sources"], "cached": True}
 
     # Step 4: Generate a response using the LLM (e.g., Ollama model)
-    response = llm.invoke(prompt)
-    sources = [doc.metadata.get("source", "Unknown") for doc in relevant_docs]
-    if used_web_search:
-        sources.append("Web")
+    response = await asyncio.to_thread(llm.invoke, plan["prompt"])
+    remember_answer(plan, query, response)
     # Step 5: Return the result with sources
     return {
         "answer": response,
-        "sources": sources
+        "sources": plan["sources"],
+        "context_stats": plan["context_stats"]
     }
 
+@app.post("/ask/stream")
+async def ask_question_stream(query: str = Form(...)):
+    if qa is None:
+        logger.error("QA system not ready!")
+        return {"error": "QA system not ready. Please upload documents first."}
+
+    logger.info(f"Streaming query received: {query}")
+
+    # Server-sent events: sources, token*, done (with timings) or error
+    async def events():
+        request_started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        try:
+            plan = await prepare_answer(query, timings)
+            yield sse("sources", {
+                "sources": plan["sources"],
+                "scores": plan["scores"],
+                "cached": plan["cached"] is not None,
+                "used_web_search": plan["used_web_search"],
+                "context_stats": plan["context_stats"],
+            })
+            if plan["cached"] is not None:
+                timings["first_token_ms"] = timings["last_token_ms"] = elapsed_ms(request_started)
+                yield sse("token", {"text": plan["cached"]["answer"]})
+            else:
+                parts = []
+                # The Ollama stream is blocking; pull it from a worker thread
+                async for chunk in iterate_in_threadpool(llm.stream(plan["prompt"])):
+                    if not parts:
+                        timings["first_token_ms"] = elapsed_ms(request_started)
+                    parts.append(chunk)
+                    yield sse("token", {"text": chunk})
+                timings["last_token_ms"] = elapsed_ms(request_started)
+                remember_answer(plan, query, "".join(parts))
+            logger.info(f"Streamed answer timings: {timings}")
+            yield sse("done", {"timings": timings})
+        except Exception as e:
+            logger.exception("Streaming /ask failed")
+            yield sse("error", {"detail": str(e), "timings": timings})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/documents/{source}")
+async def delete_document(source: str):
+    started = time.perf_counter()
+    if not doc_index.has_source(source) and not os.path.exists(f"docs/{os.path.basename(source)}"):
+        raise HTTPException(status_code=404, detail=f"Unknown document: {source}")
+
+    # Deletes the source's chunks by ID and drops cached answers that cited it
+    deleted = await asyncio.to_thread(ingest_jobs.delete_source, source)
+    path = f"docs/{os.path.basename(source)}"
+    if os.path.exists(path):
+        os.remove(path)
+
+    logger.info(f"Deleted {source}: {deleted} chunks in {elapsed_ms(started)} ms")
+    return {"message": f"Deleted {source}", "chunks_deleted": deleted, "elapsed_ms": elapsed_ms(started)}
+
+def reset_store():
+    # Waits for in-flight searches and ingestion writes, and holds new ones until done
+    with store_lock.exclusive():
+        ingest_jobs.cancel_all()
+        reset_vectordb()
+        doc_index.clear()
+        answer_cache.clear()
+        persist_vectordb()
+        # Uploaded files are no longer indexed anywhere
+        for name in os.listdir("docs"):
+            path = os.path.join("docs", name)
+            if os.path.isfile(path):
+                os.remove(path)
+
 @app.delete("/clear")
 async def clear_data():
     logger.info("Clearing all documents and vector database...")
-    
-    # Remove folders safely
-    if os.path.exists("docs"):
-        shutil.rmtree("docs")
-    if os.path.exists("db"):
-        shutil.rmtree("db")
-
-    # Recreate empty folders
-    os.makedirs("docs", exist_ok=True)
-    os.makedirs("db", exist_ok=True)
-
-    # Reinitialize vector store
-    global vectordb, retriever, qa
-
-    # 🛠 Rebuild Chroma correctly
-    vectordb = Chroma(persist_directory="db", embedding_function=embeddings)
-    retriever = vectordb.as_retriever()
-    qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, return_source_documents=True)
-
-    logger.info("Reset complete, system ready.")
+    started = time.perf_counter()
+    await asyncio.to_thread(reset_store)
+    logger.info(f"Reset complete in {elapsed_ms(started)} ms, system ready.")
     return JSONResponse(content={"message": "All documents and database cleared successfully."})
 
+MAX_PAGE_SIZE = 500
+
 @app.get("/list_documents") # to check what docs are saved into the db
-async def list_documents():
-    results = vectordb.get()
-    docs = []
-
-    for doc_id, metadata, document in zip(results['ids'], results['metadatas'], results['documents']):
-        docs.append({
-            "id": doc_id,
-            "source": metadata.get('source', 'unknown'),
-            "text": document[:100] + "..."  # Show first 100 chars for preview
-        })
-
-    return docs
+async def list_documents(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    # One row per source from the document index; pass next_cursor back to get the next page
+    docs = await asyncio.to_thread(doc_index.list_sources, cursor, limit + 1)
+    next_cursor = docs[limit - 1]["source"] if len(docs) > limit else None
+    return {"documents": docs[:limit], "next_cursor": next_cursor}
+
+@app.get("/documents/{source}/chunks")
+async def list_chunks(source: str, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: int = -1,
+                      include_text: bool = False, preview_chars: int = Query(100, ge=0)):
+    if not doc_index.has_source(source):
+        raise HTTPException(status_code=404, detail=f"Unknown document: {source}")
+    chunks = await asyncio.to_thread(doc_index.list_chunks, source, cursor, limit + 1)
+    next_cursor = chunks[limit - 1]["position"] if len(chunks) > limit else None
+    chunks = chunks[:limit]
+
+    # Texts live in Chroma; fetch them only for this page and only when asked
+    if include_text and chunks:
+        def fetch_texts():
+            with store_lock.shared():
+                return vectordb._collection.get(ids=[c["chunk_id"] for c in chunks], include=["documents"])
+
+        results = await asyncio.to_thread(fetch_texts)
+        texts = dict(zip(results["ids"], results["documents"]))
+        for chunk in chunks:
+            text = texts.get(chunk["chunk_id"]) or ""
+            chunk["text"] = text[:preview_chars] + "..." if preview_chars and len(text) > preview_chars else text
+    return {"source": source, "chunks": chunks, "next_cursor": next_cursor}
+
+@app.get("/stats")
+async def stats():
+    return {
+        "documents": doc_index.stats(),
+        "embeddings": embeddings.stats(),
+        "answer_cache": answer_cache.stats(),
+        "web_search": web_search.stats(),
+    }
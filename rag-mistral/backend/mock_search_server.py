@@ -0,0 +1,59 @@
+# mock_search_server.py
+#
+# Local stand-in for SerpAPI: answers GET /search?q=... with SerpAPI-shaped JSON,
+# optionally after a delay, so the web fallback can be exercised offline.
+# Run:  python mock_search_server.py --port 8765 --delay 0.5
+# and start the API with WEB_SEARCH_URL=http://localhost:8765/search
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_handler(delay: float, results: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling is visible
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                self.send_error(404)
+                return
+            query = parse_qs(url.query).get("q", [""])[0]
+            time.sleep(delay)
+            body = json.dumps({
+                "search_parameters": {"q": query},
+                "organic_results": [
+                    {"position": i + 1, "title": f"Result {i + 1} for {query}",
+                     "snippet": f"Mock snippet {i + 1} about {query}."}
+                    for i in range(results)
+                ],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve SerpAPI-shaped mock search results")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--results", type=int, default=3)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay, args.results))
+    print(f"Mock search server on http://127.0.0.1:{args.port}/search (delay={args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
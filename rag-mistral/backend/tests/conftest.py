@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Modules import each other relative to backend/, as when the API is started from there
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+# tests/test_answer_cache.py
+
+from answer_cache import SemanticAnswerCache
+
+
+def test_similar_question_reuses_answer():
+    cache = SemanticAnswerCache(dim=3, max_entries=4)
+    cache.store([1.0, 0.0, 0.0], "q", "a", ["doc.pdf"])
+
+    hit = cache.lookup([0.99, 0.01, 0.0])
+    assert hit["answer"] == "a" and hit["sources"] == ["doc.pdf"]
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+
+def test_answer_racing_a_delete_of_its_source_is_not_cached():
+    cache = SemanticAnswerCache(dim=3, max_entries=4)
+    version = cache.version()
+    # The source is deleted while the LLM is still answering from its chunks
+    cache.invalidate_source("doc.pdf")
+
+    assert not cache.store([1.0, 0.0, 0.0], "q", "a", ["doc.pdf"], version=version)
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+    assert cache.stats()["stale_rejected"] == 1
+
+
+def test_change_to_an_uncited_source_keeps_the_answer():
+    cache = SemanticAnswerCache(dim=3, max_entries=4)
+    version = cache.version()
+    cache.invalidate_source("other.pdf")
+
+    assert cache.store([1.0, 0.0, 0.0], "q", "a", ["doc.pdf"], version=version)
+    assert cache.lookup([1.0, 0.0, 0.0])["answer"] == "a"
+
+
+def test_answer_racing_a_clear_is_not_cached():
+    cache = SemanticAnswerCache(dim=3, max_entries=4)
+    version = cache.version()
+    cache.clear()
+
+    assert not cache.store([1.0, 0.0, 0.0], "q", "a", ["doc.pdf"], version=version)
+    # Retrieval that starts after the reset caches normally
+    assert cache.store([1.0, 0.0, 0.0], "q", "a", ["doc.pdf"], version=cache.version())
@@ -0,0 +1,44 @@
+# tests/test_context_packer.py
+
+from types import SimpleNamespace
+
+from context_packer import merge_chunks, pack_context
+
+
+def chunk(text, start, page=0, source="doc.pdf"):
+    return SimpleNamespace(page_content=text, metadata={"source": source, "page": page, "start_index": start})
+
+
+def test_overlapping_neighbours_are_merged_on_their_offsets():
+    page = "alpha beta gamma delta epsilon zeta eta theta iota kappa"
+    first, second = page[:22], page[11:]
+    segments = merge_chunks([(chunk(first, 0), 0.2), (chunk(second, 11), 0.3)])
+
+    assert [s["text"] for s in segments] == [page]
+    assert segments[0]["start"] == 0 and segments[0]["score"] == 0.2
+
+
+def test_stale_offsets_do_not_splice_away_text():
+    # The first chunk's start_index predates an edit earlier on the page, so the
+    # offsets claim an overlap the texts don't have
+    first = "intro text alpha beta gamma"
+    second = "delta epsilon zeta eta theta iota kappa"
+    segments = merge_chunks([(chunk(first, 0), 0.2), (chunk(second, 17), 0.3)])
+
+    texts = [s["text"] for s in segments]
+    assert texts == [first, second]
+    context, _, _ = pack_context([(chunk(first, 0), 0.2), (chunk(second, 17), 0.3)])
+    assert "delta epsilon zeta eta theta iota" in context
+
+
+def test_stale_offsets_fall_back_to_the_text_overlap():
+    first = "intro text alpha beta gamma delta epsilon"
+    second = "beta gamma delta epsilon zeta eta theta iota kappa"
+    segments = merge_chunks([(chunk(first, 0), 0.2), (chunk(second, 5), 0.3)])
+
+    assert [s["text"] for s in segments] == ["intro text alpha beta gamma delta epsilon zeta eta theta iota kappa"]
+
+
+def test_chunks_of_different_pages_stay_separate():
+    segments = merge_chunks([(chunk("same words here", 0, page=0), 0.1), (chunk("same words here", 0, page=1), 0.2)])
+    assert len(segments) == 2
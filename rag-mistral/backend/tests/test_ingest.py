@@ -0,0 +1,71 @@
+# tests/test_ingest.py
+# Drives IngestJobManager._ingest with the parse/embed steps run in threads, so no
+# PDF parser or embedding model is needed.
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+import ingest
+from doc_index import DocumentIndex
+from ingest import IngestJob, IngestJobManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    store = {}
+    monkeypatch.setattr(ingest, "embed_batch", lambda texts: [[float(len(t))] for t in texts])
+    manager = IngestJobManager(
+        store_chunks=lambda ids, texts, metas, vecs: store.update(
+            (i, {"text": t, "metadata": m, "embedded": True}) for i, t, m in zip(ids, texts, metas)),
+        update_metadata=lambda ids, metas: [store[i].update(metadata=m) for i, m in zip(ids, metas)],
+        delete_chunks=lambda ids: [store.pop(i) for i in ids],
+        purge_source=lambda source: None,
+        doc_index=DocumentIndex(str(tmp_path / "doc_index.sqlite3")),
+        processes=1,
+    )
+    manager._processes.shutdown()
+    manager._processes = ThreadPoolExecutor(max_workers=1)
+    manager.store = store
+    yield manager
+    manager.shutdown()
+
+
+def ingest_page(manager, monkeypatch, tmp_path, texts, version):
+    path = tmp_path / "doc.pdf"
+    path.write_text(version)
+    chunks, offset = [], 0
+    for text in texts:
+        chunks.append((text, {"source": "doc.pdf", "page": 0, "start_index": offset}))
+        offset += len(text) + 1
+    monkeypatch.setattr(ingest, "parse_and_split", lambda p, source: (1, chunks))
+    job = IngestJob("doc.pdf", str(path))
+    manager._ingest(job)
+    assert job.status == "done", job.error
+    return job
+
+
+def test_reused_chunks_follow_their_new_offsets(manager, monkeypatch, tmp_path):
+    ingest_page(manager, monkeypatch, tmp_path, ["short intro", "alpha beta gamma", "delta epsilon"], "v1")
+    for entry in manager.store.values():
+        entry["embedded"] = False
+
+    # The intro grows, so the unchanged chunks after it move
+    job = ingest_page(manager, monkeypatch, tmp_path, ["a much longer intro", "alpha beta gamma", "delta epsilon"], "v2")
+
+    assert (job.chunks_embedded, job.chunks_reused, job.chunks_moved, job.chunks_deleted) == (1, 2, 2, 1)
+    by_text = {e["text"]: e for e in manager.store.values()}
+    assert by_text["alpha beta gamma"]["metadata"]["start_index"] == 20
+    assert by_text["delta epsilon"]["metadata"]["start_index"] == 37
+    # Moved chunks were not re-embedded
+    assert not by_text["alpha beta gamma"]["embedded"]
+    assert sorted(manager.doc_index.chunk_starts("doc.pdf").values()) == [0, 20, 37]
+
+
+def test_unmoved_chunks_are_left_alone(manager, monkeypatch, tmp_path):
+    ingest_page(manager, monkeypatch, tmp_path, ["intro", "alpha beta gamma", "delta epsilon"], "v1")
+    job = ingest_page(manager, monkeypatch, tmp_path, ["intro", "alpha beta gamma", "delta epsilon", "new tail"], "v2")
+
+    assert (job.chunks_embedded, job.chunks_reused, job.chunks_moved, job.chunks_deleted) == (1, 3, 0, 0)
@@ -0,0 +1,77 @@
+# tests/test_web_search.py
+# Runs WebSearchClient against mock_search_server.py on a free local port.
+
+import asyncio
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from mock_search_server import make_handler
+from web_search import SearchBackend, SerpApiBackend, WebSearchClient
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(delay: float = 0.0, results: int = 3) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(delay, results))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/search"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_backend_must_implement_search():
+    with pytest.raises(TypeError):
+        SearchBackend()
+
+
+def test_results_are_cached(mock_server):
+    client = WebSearchClient(SerpApiBackend("key", mock_server()))
+
+    first = asyncio.run(client.search("Current  Mortgage rates"))
+    second = asyncio.run(client.search("current mortgage rates"))
+
+    assert first == second == [f"Mock snippet {i} about Current  Mortgage rates." for i in (1, 2, 3)]
+    assert (client.hits, client.misses) == (1, 1)
+
+
+def test_read_timeout_returns_no_results_and_is_not_cached(mock_server):
+    client = WebSearchClient(SerpApiBackend("key", mock_server(delay=1.0)), read_timeout=0.2)
+
+    started = time.perf_counter()
+    assert asyncio.run(client.search("slow query")) == []
+    assert time.perf_counter() - started < 0.9
+    assert client.errors == 1
+    assert client.stats()["entries"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_search(mock_server):
+    client = WebSearchClient(SerpApiBackend("key", mock_server(delay=0.3)))
+
+    async def scenario():
+        abandoned = asyncio.ensure_future(client.search("shared query"))
+        waiting = asyncio.ensure_future(client.search("shared query"))
+        await asyncio.sleep(0.05)
+        # e.g. a speculative search that turned out to be unnecessary
+        abandoned.cancel()
+        results = await waiting
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3
+    assert client.misses == 2 and client.errors == 0
+    # The one backend call filled the cache for later requests
+    assert asyncio.run(client.search("shared query")) == results
+    assert client.hits == 1
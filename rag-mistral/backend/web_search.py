@@ -0,0 +1,148 @@
+# web_search.py
+# Web fallback for /ask. One pooled HTTP session with timeouts, a TTL cache keyed
+# by the normalized query, and pluggable backends (SerpAPI, or any server that
+# speaks its response format, such as mock_search_server.py).
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3.0     # seconds
+READ_TIMEOUT = 8.0
+POOL_SIZE = 8             # keep-alive connections per host
+CACHE_TTL = 3600          # seconds a query's results are reused
+CACHE_MAX_ENTRIES = 1000
+MAX_RESULTS = 5
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class SearchBackend(ABC):
+    """Turns a query into a list of text snippets using the given HTTP session."""
+    name = "base"
+
+    @abstractmethod
+    def search(self, session: requests.Session, query: str, timeout: Tuple[float, float]) -> List[str]:
+        ...
+
+
+class SerpApiBackend(SearchBackend):
+    name = "serpapi"
+
+    def __init__(self, api_key: str, url: str = "https://serpapi.com/search", engine: str = "google"):
+        self.api_key = api_key
+        self.url = url
+        self.engine = engine  # You can change to other engines like "bing"
+
+    def search(self, session: requests.Session, query: str, timeout: Tuple[float, float]) -> List[str]:
+        params = {"q": query, "api_key": self.api_key, "engine": self.engine}
+        response = session.get(self.url, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        return [r.get("snippet", "No snippet available") for r in data.get("organic_results", [])[:MAX_RESULTS]]
+
+
+class StaticBackend(SearchBackend):
+    """Canned snippets without any network access, for tests and offline runs."""
+    name = "static"
+
+    def __init__(self, results: Optional[Dict[str, List[str]]] = None, default: Optional[List[str]] = None):
+        self.results = {normalize_query(q): r for q, r in (results or {}).items()}
+        self.default = default or []
+
+    def search(self, session: requests.Session, query: str, timeout: Tuple[float, float]) -> List[str]:
+        return list(self.results.get(normalize_query(query), self.default))
+
+
+class WebSearchClient:
+    def __init__(self, backend: SearchBackend, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 pool_size: int = POOL_SIZE):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Concurrent requests for the same query share one backend call
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _cached(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return results
+
+    def _fetch(self, key: str, query: str) -> List[str]:
+        # Runs in a worker thread; the cache is filled here so a result still lands
+        # even if the awaiting request was cancelled (e.g. an unused speculative search)
+        started = time.perf_counter()
+        try:
+            results = self.backend.search(self.session, query, self.timeout)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Web search via {self.backend.name} failed after "
+                           f"{time.perf_counter() - started:.2f}s: {e}")
+            return []  # failures are not cached
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return results
+
+    async def search(self, query: str) -> List[str]:
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results is not None:
+            self.hits += 1
+            return list(results)
+        self.misses += 1
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(self._fetch, key, query))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: one caller giving up must not cancel the call for the others
+        return list(await asyncio.shield(future))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "errors": self.errors,
+        }
@@ -1,3 +1,5 @@
+import json
+import time
 import streamlit as st
 import requests
 
@@ -5,18 +7,42 @@ st.title("📄 PDF Chatbot with Mistral")
 
 # Upload section
 st.header("Upload PDFs")
-uploaded_file = st.file_uploader("Upload a PDF file", type=["pdf"])
+uploaded_files = st.file_uploader("Upload PDF files", type=["pdf"], accept_multiple_files=True)
 
-if uploaded_file:
-    if st.button("Upload Document"):
-        with st.spinner("Uploading file..."):
-            files = {"file": (uploaded_file.name, uploaded_file, "application/pdf")}
-            response = requests.post("http://localhost:8000/upload", files=files)
+if uploaded_files:
+    if st.button("Upload Documents"):
+        files = [("files", (f.name, f, "application/pdf")) for f in uploaded_files]
+        response = requests.post("http://localhost:8000/upload", files=files)
 
-            if response.ok:
-                st.success(response.json()["message"])
+        if not response.ok:
+            st.error(f"Failed to upload: {response.text}")
+        else:
+            # Files are processed in the background; poll each job until it finishes
+            jobs = response.json()["jobs"]
+            bars = {job["job_id"]: st.progress(0.0, text=f"{job['source']}: queued") for job in jobs}
+            pending = set(bars)
+            outcomes = {}
+            while pending:
+                time.sleep(1)
+                for job_id in list(pending):
+                    job = requests.get(f"http://localhost:8000/jobs/{job_id}").json()
+                    total = job["chunks_total"] or 1
+                    text = f"{job['source']}: {job['status']} ({job['pages_parsed']} pages, {job['chunks_embedded']}/{job['chunks_total']} chunks)"
+                    done_chunks = job["chunks_embedded"] + job["chunks_reused"]
+                    bars[job_id].progress(1.0 if job["status"] == "unchanged" else min(done_chunks / total, 1.0), text=text)
+                    if job["status"] in ("done", "unchanged", "failed", "cancelled"):
+                        pending.discard(job_id)
+                        outcomes[job_id] = job["status"]
+                        if job["status"] == "failed":
+                            st.error(f"{job['source']}: {job['error']}")
+            # Report what actually happened to each file, not just that polling ended
+            counts = {status: list(outcomes.values()).count(status)
+                      for status in ("done", "unchanged", "failed", "cancelled")}
+            summary = ", ".join(f"{n} {status}" for status, n in counts.items() if n)
+            if counts["failed"] or counts["cancelled"]:
+                st.warning(f"Finished with problems: {summary}")
             else:
-                st.error(f"Failed to upload: {response.text}")
+                st.success(f"All files processed: {summary}")
 
 
 # Question/Answer section
@@ -28,17 +54,35 @@ if st.button("Ask"):
     if not query.strip():
         st.error("Please enter a question first!")
     else:
-        with st.spinner("Thinking..."):
-            response = requests.post("http://localhost:8000/ask", data={"query": query})
+        # The answer is streamed as server-sent events: sources first, then tokens, then timings
+        response = requests.post("http://localhost:8000/ask/stream", data={"query": query}, stream=True)
 
-            if response.ok:
-                answer = response.json()["answer"]
-                sources = response.json()["sources"]
-
-                st.success(answer)
-                st.info(f"Answer based on: {', '.join(set(sources))}")
-            else:
-                st.error(f"Error: {response.status_code} - {response.text}")
+        if not response.ok:
+            st.error(f"Error: {response.status_code} - {response.text}")
+        else:
+            sources_box = st.empty()
+            answer_box = st.empty()
+            answer = ""
+            event = None
+            with st.spinner("Thinking..."):
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                        continue
+                    if not line.startswith("data: "):
+                        continue
+                    data = json.loads(line[len("data: "):])
+                    if event == "sources":
+                        label = "cached answer" if data["cached"] else "retrieved"
+                        sources_box.info(f"Answer based on: {', '.join(set(data['sources'])) or 'nothing'} ({label})")
+                    elif event == "token":
+                        answer += data["text"]
+                        answer_box.success(answer)
+                    elif event == "done":
+                        timings = ", ".join(f"{k.replace('_ms', '')}: {v:.0f} ms" for k, v in data["timings"].items())
+                        st.caption(timings)
+                    elif event == "error":
+                        st.error(f"Error: {data['detail']}")
 
 # Clear database button
 if st.button("Clear all uploaded documents"):